@@ -2,9 +2,27 @@
 Tools for working with the Aus400 dataset
 """
 
-from .cat import catalogue, filter_catalogue, load, load_all, load_var
-from . import regrid
+import importlib
 
-from . import render
-from . import vertical
-from . import cross_sec
\ No newline at end of file
+from .cat import filter_catalogue, load, load_all, load_var
+
+# These submodules are only imported when first used, so their extra
+# dependencies (e.g. scipy, matplotlib, PIL) aren't loaded unless needed.
+# 'aus400.cat' is always imported, along with xarray, pandas and dask.
+_submodules = ["regrid", "render", "vertical", "cross_sec"]
+
+
+def __getattr__(name):
+    if name == "catalogue":
+        from .cat import get_catalogue
+
+        return get_catalogue()
+
+    if name in _submodules:
+        return importlib.import_module(f".{name}", __name__)
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + ["catalogue"] + _submodules)
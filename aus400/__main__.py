@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# Copyright 2020 Scott Wales
+# author: Scott Wales <scott.wales@unimelb.edu.au>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Command line maintenance tasks for the Aus400 library
+
+Run as ``python -m aus400 COMMAND``, see ``python -m aus400 --help``
+"""
+
+import argparse
+from pathlib import Path
+
+from . import cat
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m aus400", description="Aus400 library maintenance tasks"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    metadata = commands.add_parser(
+        "build-metadata",
+        help="Record the dimensions of each catalogue variable",
+    )
+    metadata.add_argument(
+        "--output",
+        type=Path,
+        help="Output file (default 'metadata.csv' in the aus400 cache directory)",
+    )
+
+    references = commands.add_parser(
+        "build-references",
+        help="Build reference indices for opening many files as one dataset",
+    )
+    references.add_argument(
+        "--output",
+        type=Path,
+        help="Output directory (default 'references/' in the aus400 cache directory)",
+    )
+    for column in ["resolution", "stream", "variable"]:
+        references.add_argument(
+            f"--{column}", help=f"Only index variables with this {column}"
+        )
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build-metadata":
+        print(cat.build_metadata(path=args.output))
+
+    elif args.command == "build-references":
+        filters = {
+            k: getattr(args, k)
+            for k in ["resolution", "stream", "variable"]
+            if getattr(args, k) is not None
+        }
+        for path in cat.build_references(path=args.output, **filters):
+            print(path)
+
+
+if __name__ == "__main__":
+    main()
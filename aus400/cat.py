@@ -56,29 +56,195 @@ Tools for filtering and loading from the Aus400 catalogue
 
     methods
         Variable processing
+
+    The catalogue is indexed by a sorted :class:`pandas.MultiIndex` over
+    :data:`index_columns`, see :func:`index_catalogue`.
+
+    The catalogue is read the first time it is used rather than when
+    :mod:`aus400` is imported. After the CSV files have been parsed once the
+    result is kept in a Parquet file under :func:`cache_dir` (if pyarrow is
+    available), which is used by later sessions until the CSV files change.
+
+.. py:data:: index_columns
+    :type: List[str]
+
+    Catalogue columns making up the sorted lookup index
 """
 
+import collections
+import concurrent.futures
+import hashlib
+import json
+import os
+import threading
+import numpy
 import pandas
 import xarray
 from pathlib import Path
 
+from .chunks import plan_chunks
+from . import grids
+
 root = Path("/g/data/ia89/aus400")
 
+index_columns = ["resolution", "stream", "variable", "ensemble", "time"]
+
+# Columns with few distinct values, stored as categoricals
+_categorical_columns = [
+    "runid",
+    "resolution",
+    "stream",
+    "variable",
+    "standard_name",
+    "description",
+    "methods",
+]
+
+_catalogue = None
+_catalogue_lock = threading.Lock()
+
+# Variable metadata read from 'metadata.csv', with the file's path and mtime
+_metadata = (None, None, {})
+
+# Datasets opened by load_all(), least recently used first. Static 'fx'
+# variables are kept separately, so time-varying data doesn't push them out
+_dataset_cache = collections.OrderedDict()
+_pinned_cache = collections.OrderedDict()
+_cache_lock = threading.Lock()
+_cache_size = 32
+
+# Limit of the 'fx' cache, which grows with each region an fx variable is
+# loaded for
+_pinned_size = 64
+
+
+def cache_dir() -> Path:
+    """
+    Directory for files cached locally by this library
+
+    This is '$AUS400_CACHE' if that environment variable is set, otherwise
+    '~/.cache/aus400'
+
+    Returns:
+        :obj:`pathlib.Path` of the cache directory (may not exist yet)
+    """
+    return Path(os.environ.get("AUS400_CACHE", Path.home() / ".cache" / "aus400"))
+
 
 def load_catalogue():
+    """
+    Read the Aus400 catalogue
+
+    Most users will want :data:`catalogue` instead, which only reads the
+    catalogue once per session.
+
+    The merged and indexed catalogue is cached as Parquet in
+    :func:`cache_dir`, in a file named by a hash of :data:`root`. The cache is
+    rebuilt if either source CSV file has been modified since it was written.
+
+    Returns:
+        :obj:`pandas.DataFrame` with the catalogue, or None if the Aus400 data
+        is not available
+    """
     if not root.exists():
         return None
 
-    cat = pandas.read_csv(root / "catalogue.csv", parse_dates=["time"])
-    var = pandas.read_csv(root / "variables.csv")
+    sources = [root / "catalogue.csv", root / "variables.csv"]
+    mtime = max(s.stat().st_mtime_ns for s in sources)
+    key = hashlib.sha1(str(root.resolve()).encode()).hexdigest()[:16]
+    cache = cache_dir() / f"catalogue-{key}.parquet"
+
+    try:
+        if cache.stat().st_mtime_ns >= mtime:
+            return pandas.read_parquet(cache)
+    except (OSError, ImportError, ValueError):
+        # Missing, stale or unreadable cache, or no parquet engine
+        pass
+
+    cat = pandas.read_csv(sources[0], parse_dates=["time"])
+    var = pandas.read_csv(sources[1])
+
+    cat = cat.merge(var, on=["variable", "stream"], how="left")
+    for k in _categorical_columns:
+        if k in cat:
+            cat[k] = cat[k].astype("category")
+
+    cat = index_catalogue(cat)
+
+    try:
+        # Write to a temporary file first, so other processes never see a
+        # partial cache
+        cache.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache.with_name(f".{cache.name}.{os.getpid()}")
+        cat.to_parquet(tmp)
+        os.replace(tmp, cache)
+    except (OSError, ImportError):
+        pass
+
+    return cat
+
+
+def get_catalogue():
+    """
+    The Aus400 catalogue, read on first use
+
+    This is the same object as :data:`catalogue`
+
+    Returns:
+        :obj:`pandas.DataFrame` with the catalogue, or None if the Aus400 data
+        is not available
+    """
+    global _catalogue
+
+    if _catalogue is None:
+        with _catalogue_lock:
+            if _catalogue is None:
+                _catalogue = load_catalogue()
+
+    return _catalogue
+
+
+def __getattr__(name):
+    # Read the catalogue when 'catalogue' is first accessed, not at import
+    if name == "catalogue":
+        return get_catalogue()
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def index_catalogue(cat: pandas.DataFrame) -> pandas.DataFrame:
+    """
+    Add a sorted lookup index to a catalogue
+
+    The index is a :class:`pandas.MultiIndex` over :data:`index_columns`,
+    which lets :func:`filter_catalogue` find rows using binary searches rather
+    than comparing every row. The index levels are left unnamed and the
+    columns are kept, so the result can still be grouped and sorted by column
+    name like an unindexed catalogue.
 
-    return cat.merge(var, on=["variable", "stream"], how="left")
+    Args:
+        cat: Source catalogue
 
+    Returns:
+        A copy of 'cat' sorted by the lookup index
+    """
+    index = pandas.MultiIndex.from_arrays([cat[k].values for k in index_columns])
 
-catalogue = load_catalogue()
+    return cat.set_index(index).sort_index()
 
 
-def filter_catalogue(cat: pandas.DataFrame = catalogue, **kwargs):
+def _is_indexed(cat: pandas.DataFrame) -> bool:
+    """
+    Check if 'cat' has the lookup index from :func:`index_catalogue`
+    """
+    return (
+        isinstance(cat.index, pandas.MultiIndex)
+        and cat.index.nlevels == len(index_columns)
+        and cat.index.is_monotonic_increasing
+    )
+
+
+def filter_catalogue(cat: pandas.DataFrame = None, **kwargs):
     """
     Returns a filtered view of the catalogue
 
@@ -96,14 +262,38 @@ def filter_catalogue(cat: pandas.DataFrame = catalogue, **kwargs):
     Returns:
         A filtered view of the catalogue
     """
+    if cat is None:
+        cat = get_catalogue()
+
     c = cat
 
+    if _is_indexed(c):
+        # Look up the index columns with a single search of the sorted index,
+        # leaving any other columns for the scan below
+        key = [kwargs.pop(k, slice(None)) for k in index_columns]
+
+        # A time string would be a partial match on the index (e.g. a whole
+        # day), compare it as an exact time like the scan does
+        t = index_columns.index("time")
+        if isinstance(key[t], str):
+            key[t] = pandas.Timestamp(key[t])
+        while key and isinstance(key[-1], slice) and key[-1] == slice(None):
+            key.pop()
+
+        if key:
+            try:
+                locs = c.index.get_locs(key)
+            except KeyError:
+                # Value not present anywhere in the catalogue
+                locs = []
+            c = c.iloc[locs]
+
     for k, v in kwargs.items():
         if isinstance(v, slice):
             # Handle slices
             s = c[k]
-            s_index = pandas.Series(s.index, index=s.values).sort_index()
-            c = c.loc[s_index.loc[v]]
+            s_index = pandas.Series(numpy.arange(len(s)), index=s.values).sort_index()
+            c = c.iloc[s_index.loc[v].values]
         else:
             c = c.loc[c[k] == v]
 
@@ -113,76 +303,623 @@ def filter_catalogue(cat: pandas.DataFrame = catalogue, **kwargs):
     return c
 
 
-def load_all(cat: pandas.DataFrame = catalogue, **kwargs):
+def metadata_path() -> Path:
+    """
+    Location of the variable metadata file
+
+    This is 'metadata.csv' in the Aus400 dataset if it is present, otherwise
+    'metadata.csv' in :func:`cache_dir` (which may not exist yet, see
+    :func:`build_metadata`)
+
+    Returns:
+        :obj:`pathlib.Path` of the metadata file
+    """
+    path = root / "metadata.csv"
+    if path.exists():
+        return path
+
+    return cache_dir() / "metadata.csv"
+
+
+def build_metadata(cat: pandas.DataFrame = None, path: Path = None) -> Path:
+    """
+    Record the dimensions of each variable in the catalogue
+
+    Opens one file for each (resolution, stream, variable) in 'cat' and
+    records the variable's dimension names, shape, dtype and on-disk chunk
+    sizes to a CSV file. :func:`load_all` then uses this information rather
+    than opening a sample file of every variable it loads.
+
+    This may also be run from the command line with::
+
+        python -m aus400 build-metadata
+
+    Args:
+        cat: Source catalogue (default :data:`catalogue`)
+        path: Output file (default 'metadata.csv' in :func:`cache_dir`)
+
+    Returns:
+        :obj:`pathlib.Path` of the output file
+    """
+    if cat is None:
+        cat = get_catalogue()
+
+    if path is None:
+        path = cache_dir() / "metadata.csv"
+    path = Path(path)
+
+    rows = []
+
+    for k, g in cat.groupby(["resolution", "stream", "variable"], observed=True):
+        res, stream, var = k
+        meta = _file_metadata(root / g["path"].iloc[0], var)
+
+        rows.append(
+            {
+                "resolution": res,
+                "stream": stream,
+                "variable": var,
+                "dims": " ".join(meta["dims"]),
+                "shape": " ".join(str(n) for n in meta["shape"]),
+                "dtype": str(meta["dtype"]),
+                "chunksizes": " ".join(str(n) for n in meta["chunksizes"] or []),
+            }
+        )
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pandas.DataFrame(rows).to_csv(path, index=False)
+
+    return path
+
+
+def _file_metadata(path: Path, variable: str):
+    """
+    Dimension information of 'variable' read from the file 'path', in the
+    same format as :func:`variable_metadata`
+    """
+    with xarray.open_dataset(path) as sample:
+        da = sample[variable]
+        chunks = da.encoding.get("chunksizes")
+
+        return {
+            "dims": tuple(da.dims),
+            "shape": tuple(da.shape),
+            "dtype": da.dtype,
+            "chunksizes": tuple(chunks) if chunks else None,
+        }
+
+
+def variable_metadata(resolution: str, stream: str, variable: str):
+    """
+    Dimension information of a variable, from :func:`build_metadata`
+
+    Args:
+        resolution: Variable resolution
+        stream: Variable stream
+        variable: Variable name
+
+    Returns:
+        :obj:`dict` with keys 'dims', 'shape' and 'chunksizes' (tuples, shape
+        and chunksizes are for a single file and chunksizes is None if the
+        variable is not chunked on disk) and 'dtype' (:obj:`numpy.dtype`), or
+        None if there is no information for the variable
+    """
+    global _metadata
+
+    path = metadata_path()
+
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+    if _metadata[:2] != (path, mtime):
+        table = pandas.read_csv(path, dtype=str, keep_default_na=False)
+
+        metadata = {}
+        for r in table.itertuples(index=False):
+            metadata[(r.resolution, r.stream, r.variable)] = {
+                "dims": tuple(r.dims.split()),
+                "shape": tuple(int(n) for n in r.shape.split()),
+                "dtype": numpy.dtype(r.dtype),
+                "chunksizes": tuple(int(n) for n in r.chunksizes.split()) or None,
+            }
+
+        _metadata = (path, mtime, metadata)
+
+    return _metadata[2].get((resolution, stream, variable))
+
+
+def reference_path(resolution: str, stream: str, variable: str) -> Path:
+    """
+    Location of the reference index of a variable
+
+    This is under 'references/' in the Aus400 dataset if it is present there,
+    otherwise under 'references/' in :func:`cache_dir` (which may not exist
+    yet, see :func:`build_references`)
+
+    Args:
+        resolution: Variable resolution
+        stream: Variable stream
+        variable: Variable name
+
+    Returns:
+        :obj:`pathlib.Path` of the reference index
+    """
+    name = f"{resolution}.{stream}.{variable}.json"
+
+    path = root / "references" / name
+    if path.exists():
+        return path
+
+    return cache_dir() / "references" / name
+
+
+def _scan_file(path: Path):
+    """
+    Kerchunk references for a single netCDF file
+    """
+    import fsspec
+    from kerchunk.hdf import SingleHdf5ToZarr
+
+    with fsspec.open(str(path)) as f:
+        return SingleHdf5ToZarr(f, str(path)).translate()
+
+
+def build_references(cat: pandas.DataFrame = None, path: Path = None, **kwargs):
+    """
+    Build reference indices for opening many files as a single dataset
+
+    For each (resolution, stream, variable) in the catalogue this scans the
+    variable's files and records the byte ranges of every chunk in a single
+    Kerchunk reference file, combining all time steps and ensemble members.
+    ``load_all(..., references=True)`` can then open the variable as one lazy
+    dataset without reading each file's headers.
+
+    Requires the 'kerchunk' library. The file scans are run with Dask, so are
+    spread over a Dask cluster if one is active.
+
+    This may also be run from the command line with::
+
+        python -m aus400 build-references --stream spec --variable sfc_temp
+
+    Args:
+        cat: Source catalogue (default :data:`catalogue`)
+        path: Output directory (default 'references/' in :func:`cache_dir`)
+        **kwargs: Variables to index, see :meth:`filter_catalogue`
+
+    Returns:
+        List[:obj:`pathlib.Path`] of the reference files created
+    """
+    import dask
+    from kerchunk.combine import MultiZarrToZarr
+
+    if path is None:
+        path = cache_dir() / "references"
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+
+    c = filter_catalogue(cat, **kwargs)
+
+    outputs = []
+
+    for k, g in c.groupby(["resolution", "stream", "variable"], observed=True):
+        res, stream, var = k
+
+        g = g.sort_values(["ensemble", "time"])
+        refs = dask.compute(
+            *[dask.delayed(_scan_file)(root / p) for p in g["path"]]
+        )
+
+        meta = variable_metadata(res, stream, var)
+        if meta is None:
+            meta = _file_metadata(root / g["path"].iloc[0], var)
+        dims = meta["dims"]
+
+        combined = MultiZarrToZarr(
+            list(refs),
+            concat_dims=["ensemble", "time"],
+            identical_dims=[d for d in dims if d != "time"],
+            coo_map={"ensemble": list(g["ensemble"]), "time": "cf:time"},
+        ).translate()
+
+        out = path / f"{res}.{stream}.{var}.json"
+        tmp = out.with_name(f".{out.name}.{os.getpid()}")
+        with open(tmp, "w") as f:
+            json.dump(combined, f)
+        os.replace(tmp, out)
+
+        outputs.append(out)
+
+    return outputs
+
+
+def _region(latitude=None, longitude=None, bbox=None):
+    """
+    Selection dict for a spatial subset, see :func:`load_all`
+    """
+    if bbox is not None:
+        if latitude is not None or longitude is not None:
+            raise ValueError("Use either 'bbox' or 'latitude'/'longitude', not both")
+
+        west, south, east, north = bbox
+        latitude = slice(south, north)
+        longitude = slice(west, east)
+
+    region = {}
+    if latitude is not None:
+        region["latitude"] = latitude
+    if longitude is not None:
+        region["longitude"] = longitude
+
+    return region
+
+
+def _subset(ds: xarray.Dataset, region, chunks) -> xarray.Dataset:
+    """
+    Select 'region' from an un-chunked dataset, then chunk the result
+
+    As the data is only chunked after selection the chunks line up with the
+    start of the region, and no Dask tasks are created outside of it
+    """
+    ds = ds.sel({k: v for k, v in region.items() if k in ds.dims})
+
+    return ds.chunk({k: v for k, v in chunks.items() if k in ds.dims})
+
+
+def _open_member(eg: pandas.DataFrame, chunks, region) -> xarray.Dataset:
+    """
+    Open the files of a single variable and ensemble member listed in
+    catalogue 'eg'
+    """
+    paths = eg.sort_values("time")["path"].apply(lambda p: root / p)
+
+    if not region:
+        return xarray.open_mfdataset(
+            paths,
+            combine="nested",
+            concat_dim="time",
+            parallel=True,
+            coords="minimal",
+            compat="override",
+            chunks=chunks,
+        )
+
+    # Open each file lazily without Dask (open_mfdataset always uses Dask),
+    # so the Dask graph is only made for the region once it's selected
+    files = [xarray.open_dataset(p, chunks=None) for p in paths]
+
+    ds = xarray.combine_nested(
+        [_subset(f, region, chunks) for f in files],
+        concat_dim="time",
+        coords="minimal",
+        compat="override",
+    )
+    ds.set_close(lambda: [f.close() for f in files])
+
+    return ds
+
+
+def _combine_members(ens, dss) -> xarray.Dataset:
+    """
+    Combine the datasets 'dss' of ensemble members 'ens' along a new
+    'ensemble' dimension
+    """
+    if len(dss) > 1:
+        ds = xarray.concat(dss, dim="ensemble", coords="minimal", compat="override")
+        ds.coords["ensemble"] = ens
+    else:
+        ds = dss[0]
+        ds.coords["ensemble"] = ens[0]
+        ds = ds.expand_dims("ensemble", 0)
+
+    return ds
+
+
+def _open_references(
+    cat: pandas.DataFrame, g: pandas.DataFrame, res, stream, var, chunks, region
+) -> xarray.Dataset:
+    """
+    Open a single variable listed in catalogue 'g' using its reference index
+    """
+    import fsspec
+
+    path = reference_path(res, stream, var)
+    if not path.exists():
+        raise FileNotFoundError(
+            f"No reference index for {res}.{stream}.{var}, create one with "
+            + "'build_references()'"
+        )
+
+    chunks = {"ensemble": 1, **chunks}
+
+    fs = fsspec.filesystem("reference", fo=str(path))
+    ds = xarray.open_dataset(
+        fs.get_mapper(""),
+        engine="zarr",
+        consolidated=False,
+        chunks=None if region else chunks,
+    )
+
+    if region:
+        ds = _subset(ds, region, chunks)
+
+    # The index covers every file of the variable, select the ensemble
+    # members and times of the files in 'g'. Each file holds the times from
+    # its catalogue time up to the catalogue time of the next file.
+    file_times = filter_catalogue(cat, resolution=res, stream=stream, variable=var)
+    file_times = numpy.unique(file_times["time"].values)
+    later = file_times[file_times > g["time"].max()]
+
+    in_range = ds["time"].values >= g["time"].min().to_datetime64()
+    if later.size > 0:
+        in_range &= ds["time"].values < later[0]
+
+    return ds.sel(ensemble=sorted(g["ensemble"].unique())).isel(time=in_range)
+
+
+def _freeze(value):
+    """
+    Hashable version of 'value', for use in cache keys
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, slice):
+        return ("slice", value.start, value.stop, value.step)
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, numpy.ndarray):
+        return ("array", value.dtype.str, value.shape, value.tobytes())
+    return value
+
+
+def _cache_key(k, g: pandas.DataFrame, chunks, access, region, references):
+    """
+    Cache key of a variable opened by :func:`load_all`
+
+    Rather than the filter arguments this uses the files that were selected,
+    so that different filters selecting the same files share a cache entry
+    """
+    return (
+        str(root),
+        tuple(k),
+        tuple(sorted(g["path"])),
+        _freeze(chunks),
+        access,
+        _freeze(region),
+        references,
+    )
+
+
+def _cache_get(key):
+    with _cache_lock:
+        if key in _pinned_cache:
+            _pinned_cache.move_to_end(key)
+            return _pinned_cache[key]
+
+        ds = _dataset_cache.get(key)
+        if ds is not None:
+            _dataset_cache.move_to_end(key)
+
+        return ds
+
+
+def _cache_put(key, ds, pin=False):
+    with _cache_lock:
+        if pin:
+            _pinned_cache[key] = ds
+            _pinned_cache.move_to_end(key)
+
+            while len(_pinned_cache) > _pinned_size:
+                _pinned_cache.popitem(last=False)
+            return
+
+        _dataset_cache[key] = ds
+        _dataset_cache.move_to_end(key)
+
+        while len(_dataset_cache) > _cache_size:
+            _dataset_cache.popitem(last=False)
+
+
+def clear_cache():
+    """
+    Remove all datasets from the :func:`load_all` cache, including the pinned
+    'fx' variables
+
+    Use this if the files on disk have changed.
+    """
+    with _cache_lock:
+        _dataset_cache.clear()
+        _pinned_cache.clear()
+
+
+def set_cache_size(size: int):
+    """
+    Set the number of datasets kept in the :func:`load_all` cache
+
+    Pinned 'fx' variables don't count towards this limit. They are kept in a
+    separate cache of up to 64 datasets (one per variable and region loaded),
+    which this doesn't change. A size of 0 disables caching of non-'fx'
+    variables.
+
+    Args:
+        size: Maximum number of cached datasets
+    """
+    global _cache_size
+
+    with _cache_lock:
+        _cache_size = size
+
+        while len(_dataset_cache) > _cache_size:
+            _dataset_cache.popitem(last=False)
+
+
+def load_all(
+    cat: pandas.DataFrame = None,
+    *,
+    latitude=None,
+    longitude=None,
+    bbox=None,
+    chunks=None,
+    access: str = "map",
+    references: bool = False,
+    max_workers: int = 8,
+    cache: bool = True,
+    **kwargs,
+):
     """
     Load multiple variables, e.g. from different streams or resolutions
 
     Arguments should be used to narrow down what gets loaded from the full
     catalogue
 
+    A spatial subset may be selected with 'latitude' and 'longitude' (values
+    or slices, as for :meth:`xarray.Dataset.sel`) or with 'bbox'. The subset
+    is taken before the data is chunked, so the Dask graph only covers the
+    selected region and its chunks start at the region's corner. Selecting a
+    region this way is much cheaper than calling ``.sel()`` on the full
+    domain.
+
+    Unless 'chunks' is given, each variable is chunked by
+    :func:`aus400.chunks.plan_chunks` to suit the 'access' pattern - 'map' for
+    horizontal fields, 'timeseries' for values through time at points or
+    small regions, 'column' for vertical profiles or 'section' for
+    cross-sections. The chunk size target
+    is Dask's 'array.chunk-size' setting.
+
+    If 'references' is True each variable is opened in one step from the
+    reference index made by :func:`build_references`, rather than opening
+    every file separately. This is much faster for long time ranges.
+
+    Variables and ensemble members are opened concurrently, up to
+    'max_workers' at a time.
+
+    Each variable's 'grid' attribute is set to the id of its grid in
+    :data:`aus400.grids.grids` (e.g. 'd0036t').
+
+    Opened datasets are cached, so loading the same files again with the same
+    options is fast. The cache keeps the most recently used datasets (see
+    :func:`set_cache_size`). Static 'fx' variables are kept separately, so
+    they aren't pushed out by time-varying data. Use :func:`clear_cache` to
+    empty it.
+
     Args:
+        latitude: Latitude value or slice to select
+        longitude: Longitude value or slice to select
+        bbox: Region to select, as (west, south, east, north) in degrees
+        chunks: Dask chunks to use for every variable, instead of planning
+            them
+        access: Access pattern to plan chunks for
+        references: Open the data using reference indices
+        max_workers: Number of variables or ensemble members to open at once
+        cache: Use and update the cache of opened datasets
         **kwargs: See :meth:`filter_catalogue`
 
     Returns:
         Dict[str, :obj:`xarray.Dataset`], with keys named like
         "{resolution}.{stream}.{variable}"
     """
+    if cat is None:
+        cat = get_catalogue()
+
+    region = _region(latitude, longitude, bbox)
+
     c = filter_catalogue(cat, **kwargs)
 
+    groups = list(c.groupby(["resolution", "stream", "variable"], observed=True))
+
     results = {}
+    keys = {}
+
+    # Use cached datasets if available, only opening the rest
+    for k, g in groups:
+        name = "{}.{}.{}".format(*k)
+        keys[name] = _cache_key(k, g, chunks, access, region, references)
+        if cache:
+            results[name] = _cache_get(keys[name])
+
+    missing = [(k, g) for k, g in groups if results.get("{}.{}.{}".format(*k)) is None]
+
+    def plan_group(group):
+        (res, stream, var), g = group
+
+        if chunks is not None:
+            return chunks
+
+        # Get the variable dimensions, if they weren't recorded by
+        # build_metadata() open a sample file
+        meta = variable_metadata(res, stream, var)
+        if meta is None:
+            meta = _file_metadata(root / g["path"].iloc[0], var)
 
-    for k, g in c.groupby(["resolution", "stream", "variable"]):
+        return plan_chunks(
+            meta["dims"],
+            meta["shape"],
+            meta["dtype"],
+            meta["chunksizes"],
+            access=access,
+        )
+
+    def open_task(task):
+        (res, stream, var), g, eg, var_chunks = task
+
+        if eg is None:
+            return _open_references(cat, g, res, stream, var, var_chunks, region)
+        else:
+            return _open_member(eg, var_chunks, region)
+
+    # Open everything on a thread pool, so that the time spent waiting on
+    # file metadata overlaps. This is done in two passes (chunk planning,
+    # then opening) so that tasks never wait on other tasks in the pool.
+    # pool.map() returns results in order and re-raises any errors.
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as pool:
+        planned = list(pool.map(plan_group, missing))
+
+        tasks = []
+        for (k, g), var_chunks in zip(missing, planned):
+            if references:
+                tasks.append((k, g, None, var_chunks))
+            else:
+                for e, eg in g.groupby("ensemble"):
+                    tasks.append((k, g, eg, var_chunks))
+
+        opened = iter(pool.map(open_task, tasks))
+
+    for k, g in missing:
         res, stream, var = k
         name = f"{res}.{stream}.{var}"
 
-        chunks = {"latitude": 500, "longitude": 500}
-
-        # Get the variable dimensions
-        with xarray.open_dataset(root / g["path"].iloc[0], chunks={}) as sample:
-            da = sample[var]
-            for d in da.dims:
-                if d not in chunks:
-                    chunks[d] = 1
-
-        ens = []
-        dss = []
-
-        # Load the files in each ensemble member
-        for e, eg in g.groupby("ensemble"):
-            paths = eg.sort_values("time")["path"].apply(lambda p: root / p)
-            ds = xarray.open_mfdataset(
-                paths,
-                combine="nested",
-                concat_dim="time",
-                parallel=True,
-                coords="minimal",
-                compat="override",
-                chunks=chunks,
-            )
-
-            ens.append(e)
-            dss.append(ds)
-
-        if len(dss) > 1:
-            ds = xarray.concat(dss, dim="ensemble", coords="minimal", compat="override")
-            ds.coords["ensemble"] = ens
+        if references:
+            ds = next(opened)
         else:
-            ds.coords["ensemble"] = ens[0]
-            ds = ds.expand_dims("ensemble", 0)
+            ens = sorted(g["ensemble"].unique())
+            ds = _combine_members(ens, [next(opened) for e in ens])
 
         ds[var].attrs["resolution"] = res
         ds[var].attrs["stream"] = stream
 
+        # Tag the variable with its grid, so later functions needn't work it
+        # out from the coordinates
+        try:
+            ds[var].attrs["grid"] = grids.identify(ds[var]).name
+        except ValueError:
+            pass
+
         # Remove time from fx variables
         if stream == "fx":
             ds = ds.squeeze(["time", "ensemble"], drop=True)
 
+        if cache:
+            _cache_put(keys[name], ds, pin=(stream == "fx"))
+
         results[name] = ds
 
-    return results
+    # Callers get a shallow copy, so changes to attributes or coordinates
+    # don't affect the cached dataset
+    return {name: results[name].copy() for name in keys}
 
 
-def load(cat: pandas.DataFrame = catalogue, **kwargs) -> xarray.Dataset:
+def load(cat: pandas.DataFrame = None, **kwargs) -> xarray.Dataset:
     """
     Load a single variable
 
@@ -190,7 +927,7 @@ def load(cat: pandas.DataFrame = catalogue, **kwargs) -> xarray.Dataset:
     catalogue
 
     Args:
-        **kwargs: See :meth:`filter_catalogue`
+        **kwargs: See :meth:`load_all` and :meth:`filter_catalogue`
 
     Returns:
         :obj:`xarray.Dataset`
@@ -207,7 +944,7 @@ def load(cat: pandas.DataFrame = catalogue, **kwargs) -> xarray.Dataset:
     return list(results.values())[0]
 
 
-def load_var(variable, cat: pandas.DataFrame = catalogue, **kwargs) -> xarray.DataArray:
+def load_var(variable, cat: pandas.DataFrame = None, **kwargs) -> xarray.DataArray:
     """
     Load a single variable as a DataArray
 
@@ -215,7 +952,7 @@ def load_var(variable, cat: pandas.DataFrame = catalogue, **kwargs) -> xarray.Da
     catalogue
 
     Args:
-        **kwargs: See :meth:`filter_catalogue`
+        **kwargs: See :meth:`load_all` and :meth:`filter_catalogue`
 
     Returns:
         :obj:`xarray.Dataset`
@@ -223,3 +960,164 @@ def load_var(variable, cat: pandas.DataFrame = catalogue, **kwargs) -> xarray.Da
 
     ds = load(cat, variable=variable, **kwargs)
     return ds[variable]
+
+
+def _nearest_index(coord: numpy.ndarray, values) -> numpy.ndarray:
+    """
+    Indices of the points in sorted 1d 'coord' nearest to 'values'
+    """
+    values = numpy.asarray(values)
+    upper = numpy.clip(numpy.searchsorted(coord, values), 1, coord.size - 1)
+    lower = upper - 1
+
+    return numpy.where(
+        numpy.abs(coord[upper] - values) < numpy.abs(values - coord[lower]),
+        upper,
+        lower,
+    )
+
+
+def _read_points(path: Path, variable: str, iy, ix, tiles):
+    """
+    Read the points (iy, ix) of 'variable' from a single file
+
+    'tiles' lists boxes (y0, y1, x0, x1) to read and the points within each
+    box. Returns the file's times and the values, with points as the last
+    dimension.
+    """
+    with xarray.open_dataset(path) as ds:
+        da = ds[variable]
+        values = numpy.empty(da.shape[:-2] + (iy.size,), dtype=da.dtype)
+
+        for (y0, y1, x0, x1), points in tiles:
+            block = da[..., y0:y1, x0:x1].values
+            values[..., points] = block[..., iy[points] - y0, ix[points] - x0]
+
+        return ds["time"].values, values
+
+
+def extract_points(
+    variable,
+    lats,
+    lons,
+    cat: pandas.DataFrame = None,
+    *,
+    names=None,
+    as_dataframe: bool = False,
+    **kwargs,
+):
+    """
+    Extract time series of a variable at a set of points, e.g. stations
+
+    Each point is matched to the nearest grid point, once for all files. Only
+    the disk chunks containing points are read from each file, with the points
+    grouped so that each chunk is read once. Files are read in parallel using
+    Dask, so if a Dask cluster is active the reads are spread over it.
+
+    This reads much less data than ``load_var(...).sel(..., method="nearest")``
+    when there are many points spread over the domain.
+
+    Args:
+        variable: Variable name
+        lats: Latitudes of the points
+        lons: Longitudes of the points
+        names: Names of the points (default 0 to npoints - 1)
+        as_dataframe: Return a tidy :obj:`pandas.DataFrame` rather than a
+            DataArray
+        **kwargs: See :meth:`filter_catalogue`, must select a single
+            resolution and stream
+
+    Returns:
+        :obj:`xarray.DataArray` with a 'station' dimension, and the grid point
+        latitude and longitude of each station as coordinates. If
+        'as_dataframe' is True, a :obj:`pandas.DataFrame` indexed by station,
+        time and any other dimensions.
+    """
+    import dask
+
+    c = filter_catalogue(cat, variable=variable, **kwargs)
+
+    if len(c) == 0:
+        raise ValueError("Selection is empty")
+    if c["resolution"].nunique() > 1 or c["stream"].nunique() > 1:
+        raise ValueError(
+            "Selection contains multiple resolutions or streams, refine the filter"
+        )
+
+    res = c["resolution"].iloc[0]
+    stream = c["stream"].iloc[0]
+
+    lats = numpy.atleast_1d(lats)
+    lons = numpy.atleast_1d(lons)
+    if names is None:
+        names = numpy.arange(lats.size)
+
+    # Find the grid points and their disk chunks using a sample file
+    with xarray.open_dataset(root / c["path"].iloc[0]) as sample:
+        da = sample[variable]
+        grid_lat = da["latitude"].values
+        grid_lon = da["longitude"].values
+        other = {d: da[d].values for d in da.dims[1:-2] if d in da.coords}
+        other_dims = da.dims[1:-2]
+        disk_chunks = da.encoding.get("chunksizes")
+
+    iy = _nearest_index(grid_lat, lats)
+    ix = _nearest_index(grid_lon, lons)
+
+    cy, cx = disk_chunks[-2:] if disk_chunks else (1, 1)
+
+    tiles = []
+    tile_id = pandas.Series(numpy.arange(iy.size)).groupby([iy // cy, ix // cx])
+    for _, points in tile_id:
+        points = points.values
+        box = (
+            iy[points].min(),
+            iy[points].max() + 1,
+            ix[points].min(),
+            ix[points].max() + 1,
+        )
+        tiles.append((box, points))
+
+    # Read each file as a separate task
+    ens = sorted(c["ensemble"].unique())
+    tasks = []
+    for e in ens:
+        paths = c[c["ensemble"] == e].sort_values("time")["path"]
+        tasks.append(
+            [
+                dask.delayed(_read_points)(root / p, variable, iy, ix, tiles)
+                for p in paths
+            ]
+        )
+
+    members = dask.compute(*tasks)
+
+    values = numpy.stack(
+        [numpy.concatenate([v for t, v in files], axis=0) for files in members]
+    )
+    times = numpy.concatenate([t for t, v in members[0]])
+
+    result = xarray.DataArray(
+        values,
+        dims=("ensemble", "time") + tuple(other_dims) + ("station",),
+        coords={
+            "ensemble": ens,
+            "time": times,
+            **other,
+            "station": names,
+            "latitude": ("station", grid_lat[iy]),
+            "longitude": ("station", grid_lon[ix]),
+        },
+        name=variable,
+        attrs={**da.attrs, "resolution": res, "stream": stream},
+    )
+
+    # Remove time from fx variables
+    if stream == "fx":
+        result = result.squeeze(["time", "ensemble"], drop=True)
+
+    if as_dataframe:
+        dims = ["station"] + [d for d in result.dims if d != "station"]
+        return result.transpose(*dims).to_dataframe()
+
+    return result
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# Copyright 2020 Scott Wales
+# author: Scott Wales <scott.wales@unimelb.edu.au>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Dask chunk planning for Aus400 variables
+
+The best chunking of a variable depends on how it will be used. Analyses of
+horizontal fields want large horizontal chunks, time series at a point want
+long time chunks, vertical profiles want every model level in one chunk and
+cross-sections want small horizontal chunks, so only those along the section
+are read.
+:func:`plan_chunks` builds chunks to suit an access pattern, starting from the
+chunking of the netCDF files so that a Dask chunk never splits a chunk on
+disk.
+"""
+
+import dask
+import numpy
+from dask.utils import parse_bytes
+
+horizontal_dims = ["latitude", "longitude"]
+
+#: Dimensions to grow, in order, for each access pattern. Dimensions in the
+#: same group are grown together.
+access_patterns = {
+    "map": [horizontal_dims],
+    "timeseries": [["time"]],
+    "column": [["model_level_number", "pseudo_level"], horizontal_dims],
+    "section": [["model_level_number", "pseudo_level"], ["time"]],
+}
+
+# Horizontal chunk size used if the file isn't chunked on disk
+_contiguous_horizontal = 500
+
+
+def plan_chunks(
+    dims,
+    shape,
+    dtype,
+    disk_chunks=None,
+    access: str = "map",
+    target_bytes=None,
+):
+    """
+    Plan Dask chunks for an Aus400 variable
+
+    Each chunk is a whole number of disk chunks (or of 500x500 horizontal
+    points, one step along other dimensions if the file isn't chunked). Chunks
+    are then grown along the dimensions that matter for 'access' until they
+    reach 'target_bytes' or cover the full dimension:
+
+    map
+        Horizontal fields, e.g. plotting or area means. Only the horizontal
+        dimensions are grown, so selecting a single level or time doesn't
+        read its neighbours
+
+    timeseries
+        Values through time at a point or small region. Only time is grown,
+        keeping horizontal chunks as small as the disk chunks
+
+    column
+        Vertical profiles, e.g. vertical interpolation. Levels are grown
+        first, then the horizontal dimensions
+
+    section
+        Cross-sections, see :mod:`aus400.cross_sec`. Levels are grown, then
+        time, keeping horizontal chunks as small as the disk chunks so a
+        section only reads the thin band of chunks along its path
+
+    Time chunks never cover more than one file.
+
+    Args:
+        dims: Dimension names of the variable
+        shape: Shape of the variable in a single file
+        dtype: Data type of the variable
+        disk_chunks: Chunk shape of the variable on disk, None if contiguous
+        access: Access pattern, 'map', 'timeseries', 'column' or 'section'
+        target_bytes: Target chunk size (default Dask's 'array.chunk-size'
+            setting)
+
+    Returns:
+        Dict[str, int] of chunk sizes, suitable for :func:`xarray.open_dataset`
+    """
+    if access not in access_patterns:
+        raise ValueError(
+            f"Unknown access pattern '{access}', expected one of "
+            + ", ".join(access_patterns)
+        )
+
+    if target_bytes is None:
+        target_bytes = dask.config.get("array.chunk-size")
+    target_bytes = parse_bytes(target_bytes)
+
+    itemsize = numpy.dtype(dtype).itemsize
+    sizes = dict(zip(dims, shape))
+
+    if disk_chunks is not None:
+        base = dict(zip(dims, disk_chunks))
+    else:
+        base = {
+            d: min(n, _contiguous_horizontal) if d in horizontal_dims else 1
+            for d, n in sizes.items()
+        }
+
+    chunks = dict(base)
+
+    def nbytes(c):
+        return itemsize * numpy.prod(list(c.values()), dtype="int64")
+
+    for group in access_patterns[access]:
+        group = [d for d in group if d in sizes]
+
+        # Add a base chunk to each dimension of the group in turn, until the
+        # chunk is big enough or all dimensions are full
+        growing = True
+        while growing:
+            growing = False
+            for d in group:
+                if chunks[d] >= sizes[d]:
+                    continue
+
+                trial = dict(chunks)
+                trial[d] = min(sizes[d], chunks[d] + base[d])
+                if nbytes(trial) > target_bytes:
+                    continue
+
+                chunks = trial
+                growing = True
+
+    return chunks
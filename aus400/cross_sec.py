@@ -2,54 +2,204 @@ import warnings
 import numpy as np
 import xarray as xr
 
+from . import grids
+from .regrid import RegridPlan
+
+Re = 6371e3  # radius of earth
+
+
 def deg_to_dist(lons, lats):
     """
     Converts an array of latitudes and longitudes to distance from 1st point
     Used as a coordinate for cross-sections
 
+    Each step is measured along the great circle between neighbouring points
+    (the haversine formula), so the distance is right for long sections and
+    uneven point spacing
     Input:
         lons: array of longitude points
         lats: array of latitude points
-        (lats and lons must be the same size)
+        (lats and lons must be the same size, or one may be a single value)
     Output:
-        dist: array of cumulative distances from the first point
+        dist: array of cumulative distances from the first point, in km
     """
-    
-    Re = 6371e3 # radius of earth
+    lons, lats = np.broadcast_arrays(np.atleast_1d(lons), np.atleast_1d(lats))
 
     # convert to radians
-    lons_rad = lons * np.pi/180
-    lats_rad = lats * np.pi/180
-    
-    # 3 cases:
-    # 1. meridional segment
-    if lons_rad.size == 1:
-        dlat = abs(lats_rad[1] - lats_rad[0])
-        ds = Re * dlat
-        ds = np.repeat(ds, lats_rad.size) # vectorise
-    
-    # 2. zonal segment
-    elif lats_rad.size == 1:
-        dlon = abs(lons_rad[1] - lons_rad[0])
-        ds = Re * np.cos(lats_rad) * dlon
-        ds = np.repeat(ds, lons_rad.size) # vectorise
-    
-    # 3. diagonal segment
-    else:
-        dlon = abs(lons_rad[1] - lons_rad[0])
-        dlat = abs(lats_rad[1] - lats_rad[0])
-        
-        dx = Re * np.cos(lats_rad) * dlon
-        dy = Re * dlat
+    lons_rad = np.radians(lons.astype("float64"))
+    lats_rad = np.radians(lats.astype("float64"))
+
+    dlon = np.diff(lons_rad)
+    dlat = np.diff(lats_rad)
 
-        # length of diagonal (should already be a vector)
-        ds = (dx**2 + dy**2) ** 0.5        
+    h = (
+        np.sin(dlat / 2) ** 2
+        + np.cos(lats_rad[:-1]) * np.cos(lats_rad[1:]) * np.sin(dlon / 2) ** 2
+    )
+    ds = 2 * Re * np.arcsin(np.sqrt(np.clip(h, 0, 1)))
 
-    dist = np.cumsum(ds) / 1000 # in km
+    dist = np.concatenate([[0], np.cumsum(ds)]) / 1000  # in km
 
     return dist
 
-def cross_sec(data: xr.DataArray, x0, y0, x1, y1, num_points="auto"):
+
+def great_circle(x0, y0, x1, y1, spacing):
+    """
+    Points along the great circle (x0, y0) -> (x1, y1)
+
+    The points are evenly spaced, at most 'spacing' km apart, and include
+    both end points
+    Input:
+        (x0, y0): the starting point
+        (x1, y1): the ending point
+        spacing: the distance between points in km
+    Output:
+        lons, lats: arrays of the points
+    """
+    lon = np.radians([x0, x1])
+    lat = np.radians([y0, y1])
+
+    # end points as unit vectors
+    v = np.stack(
+        [np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1
+    )
+    angle = np.arctan2(np.linalg.norm(np.cross(v[0], v[1])), np.dot(v[0], v[1]))
+
+    if angle == 0:
+        raise ValueError("Start and end points are the same!")
+
+    num_points = int(np.ceil(Re * angle / 1000 / spacing)) + 1
+    t = np.linspace(0, 1, num_points)[:, None]
+
+    # spherical linear interpolation between the end points
+    p = (np.sin((1 - t) * angle) * v[0] + np.sin(t * angle) * v[1]) / np.sin(angle)
+
+    lons = np.degrees(np.arctan2(p[:, 1], p[:, 0]))
+    lats = np.degrees(np.arcsin(np.clip(p[:, 2], -1, 1)))
+
+    return lons, lats
+
+
+def _segment_points(grid, x0, y0, x1, y1, num_points="auto", spacing=None):
+    """
+    Points along the segment (x0, y0) -> (x1, y1) of a section
+
+    If 'spacing' is given the points are along the great circle, 'spacing'
+    km apart, see :func:`great_circle`.
+
+    Otherwise the segment is a straight line in latitude and longitude. The
+    end points are moved to the grid points at the corners of the segment's
+    box (or to the nearest grid row or column for zonal and meridional
+    segments), and by default there is one point per grid point along the
+    longer side of the box
+    Output:
+        (x0, y0, x1, y1) moved onto the grid, and the longitudes and
+        latitudes of the points
+    """
+    if spacing is not None:
+        x, y = great_circle(x0, y0, x1, y1, spacing)
+        return (x0, y0, x1, y1), x, y
+
+    lat, lon = grid.region((min(y0, y1), max(y0, y1)), (min(x0, x1), max(x0, x1)))
+
+    # zonal and meridional segments use the nearest grid row or column
+    iy, ix = grid.index([y0, y1], [x0, x1])
+    if y0 == y1:
+        lat = grid.latitude[iy[:1]]
+    if x0 == x1:
+        lon = grid.longitude[ix[:1]]
+
+    if lat.size == 0 or lon.size == 0:
+        raise ValueError("Section doesn't contain any grid points")
+
+    # move the end points onto the grid, so the resolution matches the
+    # source data
+    x0, x1 = (lon[0], lon[-1]) if x1 > x0 else (lon[-1], lon[0])
+    y0, y1 = (lat[0], lat[-1]) if y1 > y0 else (lat[-1], lat[0])
+
+    if num_points == "auto":
+        # by default, the resolution of the cross-section will be given by the
+        # longer axis
+        num_points = max(lon.size, lat.size)
+
+    x = np.linspace(x0, x1, int(num_points))
+    y = np.linspace(y0, y1, int(num_points))
+
+    return (x0, y0, x1, y1), x, y
+
+
+class SectionPlan:
+    """
+    Bilinear interpolation from an Aus400 grid to the points of a diagonal
+    cross-section (x0, y0) -> (x1, y1)
+
+    The points are chosen as :func:`cross_sec` does: the end points are moved
+    to the grid points at the corners of the section's box, and by default
+    there is one point per grid point along the longer side of the box. With
+    'spacing' the points are instead along the great circle between the end
+    points, 'spacing' km apart. The
+    four neighbouring grid points and weights of each point are found once
+    when the plan is made (see :class:`aus400.regrid.RegridPlan`), so
+    applying it to many variables and times is just a gather and a weighted
+    sum.
+
+    Dask data is gathered chunk by chunk, and only the chunks containing the
+    section's points are read rather than its whole bounding box. Load data
+    with ``access="section"`` (see :func:`aus400.chunks.plan_chunks`) so that
+    the chunks along the section stay small.
+
+    Input:
+        grid: source grid, e.g. ``aus400.grids.grids["d0036t"]``
+        (x0, y0): the starting point of the cross-section
+        (x1, y1): the ending point of the cross-section
+        num_points: how many points to return along the section
+        spacing: if given, sample the great circle every 'spacing' km
+    Attributes:
+        grid: source :class:`aus400.grids.Grid`
+        section: the end points (x0, y0, x1, y1), moved onto the grid
+        num_points: the number of points along the section
+        longitude, latitude: the points along the section
+        distance: distance of each point from the start in km, see
+            :func:`deg_to_dist`
+    """
+
+    def __init__(self, grid, x0, y0, x1, y1, num_points="auto", spacing=None):
+        if x0 == x1 and y0 == y1:
+            raise ValueError("Start and end points are the same!")
+
+        (x0, y0, x1, y1), x, y = _segment_points(
+            grid, x0, y0, x1, y1, num_points, spacing
+        )
+
+        self.grid = grid
+        self.section = (x0, y0, x1, y1)
+        self.num_points = x.size
+        self.spacing = spacing
+        self.longitude = x
+        self.latitude = y
+        self.distance = deg_to_dist(self.longitude, self.latitude)
+
+        self._plan = RegridPlan(grid, self.latitude, self.longitude, dims=("distance",))
+
+    def apply(self, data):
+        """
+        Interpolate data to the points of the section
+        Input:
+            data: :obj:`xarray.DataArray` or :obj:`xarray.Dataset` on the plan's
+                grid, covering the section
+        Output:
+            data_cs: the cross-section, with new dimension 'distance'
+        """
+        data_cs = self._plan.apply(data).assign_attrs(data.attrs)
+        data_cs = data_cs.assign_coords(distance=("distance", self.distance))
+
+        if self.spacing is not None:
+            return _set_section(data_cs, self.section, spacing=self.spacing)
+
+        return _set_section(data_cs, self.section, self.num_points)
+
+
+def cross_sec(data: xr.DataArray, x0, y0, x1, y1, num_points="auto", spacing=None):
     """
     Converts 3D data to 2D data along the section (x0, y0) -> (x1, y1)
     Input:
@@ -57,9 +207,17 @@ def cross_sec(data: xr.DataArray, x0, y0, x1, y1, num_points="auto"):
         (x0, y0): the starting point of the cross-section
         (x1, y1): the ending point of the cross-section
         num_points: how many points to return along the new axis
+        spacing: if given, sample along the great circle from (x0, y0) to
+                 (x1, y1) every 'spacing' km rather than along a straight
+                 line in latitude and longitude (the data must cover the
+                 section, points outside it are NaN)
     Output:
         data_cs: the interpolated cross-section, with new dimension horz_dim
                  (also contains distance as a coordinate along the cross-section)
+                 The section geometry is kept in the 'section' attribute,
+                 see :func:`section_like`
+    Diagonal sections read only the Dask chunks along the section, see
+    :class:`SectionPlan`
     Possible problems:
     - if num_points is not 'auto', then the resolution of the dataset changes, causing problems
       when doing further stuff like vertical interpolation
@@ -68,32 +226,39 @@ def cross_sec(data: xr.DataArray, x0, y0, x1, y1, num_points="auto"):
     if x0 == x1 and y0 == y1:
         raise ValueError("Start and end points are the same!")
 
+    # great circles are always interpolated, with a precomputed gather
+    if spacing is not None:
+        plan = SectionPlan(grids.identify(data), x0, y0, x1, y1, spacing=spacing)
+        return plan.apply(data)
+
     # simple cases: where the section is only along a single dimension
     # in this case, no interpolation is needed, just return the slice instead
     # renaming the sliced axis to horz_dim for consistency
     if x0 == x1:
 
-        data_cs = data.sel(latitude=slice(min(y0, y1), max(y0, y1)))
-        data_cs = data_cs.sel(longitude=x0, method="nearest")
+        data_cs = grids.sel(
+            data, latitude=slice(min(y0, y1), max(y0, y1)), longitude=x0
+        )
         
         # calculate distance and label it as the new dimension
         distance = deg_to_dist(data_cs.longitude.values, data_cs.latitude.values)
         data_cs = data_cs.assign_coords(distance=('latitude', distance))
         data_cs = data_cs.swap_dims({'latitude': 'distance'})
         
-        return data_cs
+        return _set_section(data_cs, (x0, y0, x1, y1))
     
     elif y0 == y1:
 
-        data_cs = data.sel(longitude=slice(min(x0, x1), max(x0, x1)))
-        data_cs = data_cs.sel(latitude=y0, method="nearest")
+        data_cs = grids.sel(
+            data, longitude=slice(min(x0, x1), max(x0, x1)), latitude=y0
+        )
         
         # calculate distance and label it as the new dimension
         distance = deg_to_dist(data_cs.longitude.values, data_cs.latitude.values)
         data_cs = data_cs.assign_coords(distance=('longitude', distance))
         data_cs = data_cs.swap_dims({'longitude': 'distance'})
         
-        return data_cs
+        return _set_section(data_cs, (x0, y0, x1, y1))
     
     # standard case (diagonal cross-section)
     else:
@@ -116,9 +281,24 @@ def cross_sec(data: xr.DataArray, x0, y0, x1, y1, num_points="auto"):
                             Setting end points to be on the boundary instead."
             )
 
+        # on a known grid, interpolate with a precomputed gather
+        try:
+            grid = grids.identify(data)
+        except (ValueError, KeyError):
+            grid = None
+
+        if grid is not None:
+            x0, x1 = np.clip([x0, x1], x_min, x_max)
+            y0, y1 = np.clip([y0, y1], y_min, y_max)
+
+            return SectionPlan(grid, x0, y0, x1, y1, num_points).apply(data)
+
         # cut off the relevant box
-        data = data.sel(longitude=slice(min(x0, x1), max(x0, x1)))
-        data = data.sel(latitude=slice(min(y0, y1), max(y0, y1)))
+        data = grids.sel(
+            data,
+            longitude=slice(min(x0, x1), max(x0, x1)),
+            latitude=slice(min(y0, y1), max(y0, y1)),
+        )
         
         # now update x0, x1, y0, y1 to the min/max values of the *sliced* data
         # this is important because if the input x0, etc. does not lie exactly on the data coordinates,
@@ -162,5 +342,224 @@ def cross_sec(data: xr.DataArray, x0, y0, x1, y1, num_points="auto"):
     # (by default, this is linear interpolation)
     data_cs = data.interp(longitude=x, latitude=y)
 
-    return data_cs
-    
\ No newline at end of file
+    return _set_section(data_cs, (x0, y0, x1, y1), num_points)
+
+
+def _set_section(data_cs, section, num_points=None, spacing=None):
+    """
+    Record the geometry of a section in its attributes, see :func:`section_like`
+
+    'section' is the flattened vertices (x0, y0, x1, y1, ...) of the section
+    """
+    attrs = {"section": np.asarray(section, dtype="float64")}
+    if num_points is not None:
+        attrs["section_points"] = int(num_points)
+    if spacing is not None:
+        attrs["section_spacing"] = float(spacing)
+
+    return data_cs.assign_attrs(attrs)
+
+
+def section_bbox(data_cs):
+    """
+    Bounding box of the section made by :func:`cross_sec` or
+    :func:`polyline_sec`
+    Input:
+        data_cs: output of :func:`cross_sec` or :func:`polyline_sec`
+    Output:
+        (west, south, east, north) in degrees
+    """
+    section = np.asarray(data_cs.attrs["section"])
+
+    # great circles can bow out past their end points, so include the points
+    # along the section
+    x = np.concatenate([section[0::2], np.ravel(data_cs["longitude"].values)])
+    y = np.concatenate([section[1::2], np.ravel(data_cs["latitude"].values)])
+
+    return x.min(), y.min(), x.max(), y.max()
+
+
+def section_like(data, data_cs):
+    """
+    Cross-section of 'data' along the same section as 'data_cs'
+
+    The section geometry is stored in the attributes of the output of
+    :func:`cross_sec` and :func:`polyline_sec`, so other variables can be
+    sectioned to match
+    Input:
+        data: the data to interpolate, on the same grid as 'data_cs'
+        data_cs: output of :func:`cross_sec` or :func:`polyline_sec`
+    Output:
+        the cross-section of 'data', with the same points as 'data_cs'
+    """
+    section = np.asarray(data_cs.attrs["section"])
+    num_points = data_cs.attrs.get("section_points", "auto")
+    spacing = data_cs.attrs.get("section_spacing")
+
+    if section.size == 4:
+        x0, y0, x1, y1 = section
+        return cross_sec(data, x0, y0, x1, y1, num_points=num_points, spacing=spacing)
+
+    return polyline_sec(
+        data, section[0::2], section[1::2], num_points=num_points, spacing=spacing
+    )
+
+
+def _vertices(section):
+    """
+    Vertices [(x0, y0), (x1, y1), ...] of a section given either as vertices
+    or as (x0, y0, x1, y1)
+    """
+    section = np.asarray(section, dtype="float64")
+    if section.ndim == 1:
+        section = section.reshape(-1, 2)
+
+    if section.shape[0] < 2 or section.shape[1] != 2:
+        raise ValueError("Sections need at least two (x, y) vertices")
+
+    return section
+
+
+class MultiSectionPlan:
+    """
+    Bilinear interpolation from an Aus400 grid to the points of many
+    cross-sections at once, each a straight line or a polyline
+
+    Each segment of a section is sampled like :class:`SectionPlan`, without
+    repeating the first point of each later segment, and the distance is
+    measured along the whole path. The points of every section are gathered
+    together, so each Dask chunk is read once no matter how many sections
+    cross it, and extracting many sections costs about the same I/O as
+    reading their union.
+
+    Input:
+        grid: source grid, e.g. ``aus400.grids.grids["d0036t"]``
+        sections: list of sections, each a list of (x, y) vertices or a
+            straight section (x0, y0, x1, y1)
+        num_points: how many points to return along each segment
+        spacing: if given, sample each segment along its great circle every
+            'spacing' km, see :func:`great_circle`
+    Attributes:
+        grid: source :class:`aus400.grids.Grid`
+        sections: the vertices of each section, as given
+        longitude, latitude, distance: lists with the points of each section,
+            and their distance along the section in km
+    """
+
+    def __init__(self, grid, sections, num_points="auto", spacing=None):
+        self.grid = grid
+        self.sections = [_vertices(s) for s in sections]
+        self.num_points = num_points
+        self.spacing = spacing
+        self.longitude = []
+        self.latitude = []
+        self.distance = []
+
+        for vertices in self.sections:
+            xs, ys = [], []
+
+            for (x0, y0), (x1, y1) in zip(vertices[:-1], vertices[1:]):
+                _, x, y = _segment_points(grid, x0, y0, x1, y1, num_points, spacing)
+
+                if xs:
+                    # the segment starts at the end of the last one, drop
+                    # the shared vertex
+                    x, y = x[1:], y[1:]
+
+                xs.append(x)
+                ys.append(y)
+
+            x, y = np.concatenate(xs), np.concatenate(ys)
+            self.longitude.append(x)
+            self.latitude.append(y)
+            self.distance.append(deg_to_dist(x, y))
+
+        self._plan = RegridPlan(
+            grid,
+            np.concatenate(self.latitude),
+            np.concatenate(self.longitude),
+            dims=("distance",),
+        )
+
+    def apply(self, data, stack: bool = True):
+        """
+        Interpolate data to the points of the sections
+        Input:
+            data: :obj:`xarray.DataArray` or :obj:`xarray.Dataset` on the plan's
+                grid, covering the sections
+            stack: if True, return the sections along a new 'section'
+                dimension, padded with NaN to the length of the longest
+                section. Otherwise the sections are concatenated along
+                'distance', with a 'section' coordinate
+        Output:
+            data_cs: the cross-sections. Stacked sections have dimensions
+                ('section', 'point'), with 'distance', 'latitude' and
+                'longitude' coordinates.
+        """
+        data_cs = self._plan.apply(data).assign_attrs(data.attrs)
+
+        sizes = [d.size for d in self.distance]
+        section = np.repeat(np.arange(len(sizes)), sizes)
+        data_cs = data_cs.assign_coords(
+            distance=("distance", np.concatenate(self.distance)),
+            section=("distance", section),
+        )
+
+        if not stack:
+            return data_cs
+
+        # position of each (section, point) in the concatenated points
+        start = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        point = np.arange(max(sizes))
+        valid = point[None, :] < np.asarray(sizes)[:, None]
+        index = np.where(valid, start[:, None] + point[None, :], 0)
+
+        data_cs = data_cs.drop_vars("section").isel(
+            distance=xr.DataArray(index, dims=("section", "point"))
+        )
+
+        return data_cs.where(xr.DataArray(valid, dims=("section", "point")))
+
+
+def polyline_sec(data, lons, lats, num_points="auto", spacing=None):
+    """
+    Cross-section along a polyline, e.g. a flight track or a front
+    Input:
+        data: the data to interpolate, on an Aus400 grid
+        lons, lats: the vertices of the polyline
+        num_points: how many points to return along each segment
+        spacing: if given, follow great circles between the vertices,
+                 sampled every 'spacing' km
+    Output:
+        data_cs: the cross-section, with new dimension 'distance' measured
+                 along the polyline. The vertices are kept in the 'section'
+                 attribute, see :func:`section_like`
+    """
+    section = np.stack([np.asarray(lons), np.asarray(lats)], axis=-1)
+
+    plan = MultiSectionPlan(grids.identify(data), [section], num_points, spacing)
+    data_cs = plan.apply(data, stack=False).drop_vars("section")
+
+    if num_points == "auto" or spacing is not None:
+        num_points = None
+
+    return _set_section(data_cs, section.ravel(), num_points, spacing)
+
+
+def multi_sec(data, sections, num_points="auto", stack: bool = True, spacing=None):
+    """
+    Extract many cross-sections at once, reading each Dask chunk once
+    Input:
+        data: the data to interpolate, on an Aus400 grid
+        sections: list of sections, each a list of (x, y) vertices or a
+            straight section (x0, y0, x1, y1)
+        num_points: how many points to return along each segment
+        spacing: if given, follow great circles sampled every 'spacing' km
+        stack: stack the sections along a new 'section' dimension, or
+            concatenate them along 'distance', see :meth:`MultiSectionPlan.apply`
+    Output:
+        data_cs: the cross-sections
+    """
+    plan = MultiSectionPlan(grids.identify(data), sections, num_points, spacing)
+
+    return plan.apply(data, stack=stack)
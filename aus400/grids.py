@@ -0,0 +1,322 @@
+#!/usr/bin/env python
+# Copyright 2020 Scott Wales
+# author: Scott Wales <scott.wales@unimelb.edu.au>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Geometry of the Aus400 grids
+
+Aus400 data is on regular latitude-longitude grids, at resolutions 'd0036'
+(0.0036 degree spacing) and 'd0198' (0.0198 degree spacing). Each resolution
+has a 't' grid for scalars and 'u', 'v' grids for vector components, offset
+half a grid spacing E-W and N-S respectively (an Arakawa C grid).
+
+:data:`grids` holds a :class:`Grid` for each of these. As the grids are
+regular, converting a latitude or longitude to an index is simple arithmetic
+rather than a search of the coordinate values, see :meth:`Grid.sel`.
+
+Variables opened by :func:`aus400.cat.load_all` are tagged with their grid in
+the 'grid' attribute, which :func:`identify` uses before falling back to
+looking at the coordinates.
+
+.. py:data:: grids
+    :type: Dict[str, Grid]
+
+    The Aus400 grids, by id (e.g. 'd0036t')
+"""
+
+import dataclasses
+from typing import Tuple
+
+import numpy
+
+
+@dataclasses.dataclass(frozen=True)
+class Grid:
+    """
+    A regular Aus400 latitude-longitude grid
+
+    Attributes:
+        name: Grid id, e.g. 'd0036t'
+        resolution: Resolution id, e.g. 'd0036'
+        stagger: Subgrid, 't', 'u' or 'v'
+        spacing: Grid spacing in degrees
+        lat0: Latitude of the southernmost row
+        lon0: Longitude of the westernmost column
+        shape: (latitude, longitude) number of points
+    """
+
+    name: str
+    resolution: str
+    stagger: str
+    spacing: float
+    lat0: float
+    lon0: float
+    shape: Tuple[int, int]
+
+    @property
+    def latitude(self) -> numpy.ndarray:
+        """
+        Latitudes of the grid rows
+        """
+        return self.lat0 + self.spacing * numpy.arange(self.shape[0])
+
+    @property
+    def longitude(self) -> numpy.ndarray:
+        """
+        Longitudes of the grid columns
+        """
+        return self.lon0 + self.spacing * numpy.arange(self.shape[1])
+
+    def lat_index(self, lat):
+        """
+        Fractional row index of latitudes 'lat'
+        """
+        return (numpy.asarray(lat) - self.lat0) / self.spacing
+
+    def lon_index(self, lon):
+        """
+        Fractional column index of longitudes 'lon'
+        """
+        return (numpy.asarray(lon) - self.lon0) / self.spacing
+
+    def index(self, lat, lon):
+        """
+        Indices of the grid points nearest to (lat, lon)
+
+        Args:
+            lat: Latitudes
+            lon: Longitudes
+
+        Returns:
+            (row, column) tuple of integer indices, clipped to the grid
+        """
+        iy = numpy.clip(numpy.rint(self.lat_index(lat)), 0, self.shape[0] - 1)
+        ix = numpy.clip(numpy.rint(self.lon_index(lon)), 0, self.shape[1] - 1)
+
+        return iy.astype("int64"), ix.astype("int64")
+
+    def region(self, lat_range, lon_range):
+        """
+        Coordinates of the grid points within a region
+
+        Args:
+            lat_range: (min, max) latitude
+            lon_range: (min, max) longitude
+
+        Returns:
+            (latitude, longitude) tuple of :obj:`numpy.ndarray`
+        """
+        y = _range_index(self.lat_index, *lat_range, 0, self.shape[0])
+        x = _range_index(self.lon_index, *lon_range, 0, self.shape[1])
+
+        return self.latitude[y], self.longitude[x]
+
+    def sel(self, data, latitude=None, longitude=None):
+        """
+        Select from data on this grid by latitude and longitude
+
+        Like :meth:`xarray.Dataset.sel`, but the indices are computed from
+        the grid geometry rather than by searching the coordinates. 'data'
+        may be any region of the grid. Values select the nearest point,
+        slices select the points within the range (which must be increasing).
+
+        Args:
+            data: :obj:`xarray.DataArray` or :obj:`xarray.Dataset` on this
+                grid
+            latitude: Latitude value, array or slice
+            longitude: Longitude value, array or slice
+
+        Returns:
+            The selected part of 'data'
+        """
+        indexers = {}
+
+        for dim, value, to_index in [
+            ("latitude", latitude, self.lat_index),
+            ("longitude", longitude, self.lon_index),
+        ]:
+            if value is None:
+                continue
+
+            # Offset of 'data' within the grid
+            offset = int(numpy.rint(to_index(data[dim].values[0])))
+            size = data.sizes[dim]
+
+            if isinstance(value, slice):
+                indexers[dim] = _range_index(
+                    to_index, value.start, value.stop, offset, size
+                )
+            else:
+                i = numpy.rint(to_index(value)).astype("int64") - offset
+                indexers[dim] = numpy.clip(i, 0, size - 1)
+
+        return data.isel(indexers)
+
+
+def _range_index(to_index, lo, hi, offset, size) -> slice:
+    """
+    Slice of the points with coordinates between 'lo' and 'hi', in an axis of
+    length 'size' starting at grid index 'offset'
+    """
+    # Allow for rounding in the coordinates
+    start = 0 if lo is None else int(numpy.ceil(to_index(lo) - 1e-6)) - offset
+    stop = size if hi is None else int(numpy.floor(to_index(hi) + 1e-6)) - offset + 1
+
+    start = min(max(start, 0), size)
+    stop = min(max(stop, start), size)
+
+    return slice(start, stop)
+
+
+def _make_grids():
+    # Southwest corner and shape of the t grids, from the coordinates of the
+    # model output. The d0198 domain is larger than the d0036 domain, and the
+    # two are not aligned with each other: (-27.8, 133.26) is a d0198t point
+    # but only lies on a d0036t row, not a column.
+    base = {
+        "d0036": (0.0036, -46.7972, 109.5106, (10554, 13194)),
+        "d0198": (0.0198, -48.788, 107.52, (2120, 2600)),
+    }
+
+    out = {}
+    for res, (spacing, lat0, lon0, shape) in base.items():
+        half = spacing / 2
+        for stagger, dlat, dlon in [("t", 0, 0), ("u", 0, half), ("v", half, 0)]:
+            name = f"{res}{stagger}"
+            out[name] = Grid(name, res, stagger, spacing, lat0 + dlat, lon0 + dlon, shape)
+
+    return out
+
+
+grids = _make_grids()
+
+
+def _spacing(coord) -> float:
+    values = numpy.atleast_1d(coord)
+    if values.size > 1:
+        return abs(values[1] - values[0])
+    return 0
+
+
+def _matches(grid: Grid, data) -> bool:
+    """
+    Check the latitude and longitude of 'data' lie on 'grid'
+
+    Coordinates along another dimension, like the points of a diagonal
+    cross-section, aren't checked
+    """
+    for name, to_index in [("latitude", grid.lat_index), ("longitude", grid.lon_index)]:
+        if name not in data.coords:
+            continue
+        coord = data[name]
+        if coord.ndim > 1 or (coord.ndim == 1 and coord.dims != (name,)):
+            continue
+
+        values = numpy.atleast_1d(coord.values)
+        if values.size == 0:
+            continue
+        # Allow for coordinates stored as float32
+        if values.size > 1 and abs(_spacing(values) - grid.spacing) > 0.01 * grid.spacing:
+            return False
+
+        i = to_index(values[0])
+        if abs(i - numpy.rint(i)) > 0.01:
+            return False
+
+    return True
+
+
+def identify(data) -> Grid:
+    """
+    Identify the grid of an Aus400 variable
+
+    The 'grid' attribute set by :func:`aus400.cat.load_all` is used if
+    present and the coordinates are still on that grid (operations like
+    :meth:`xarray.DataArray.interp` keep the attribute), otherwise the grid is
+    found from the first two coordinate values.
+    This also works for cross-sections, where at least one of latitude and
+    longitude keeps its grid spacing.
+
+    Args:
+        data: :obj:`xarray.DataArray` or :obj:`xarray.Dataset` to identify
+
+    Returns:
+        :obj:`Grid`
+    """
+    attrs = [data.attrs]
+    if hasattr(data, "data_vars"):
+        attrs += [v.attrs for v in data.data_vars.values()]
+
+    for a in attrs:
+        if a.get("grid") in grids and _matches(grids[a["grid"]], data):
+            return grids[a["grid"]]
+
+    lat = data["latitude"].values
+    lon = data["longitude"].values
+
+    # Grid spacing, rounded to the nearest 0.0001 degree
+    delta = round(max(_spacing(lat), _spacing(lon)) * 10000) / 10000
+
+    t = [g for g in grids.values() if g.stagger == "t" and abs(g.spacing - delta) < 1e-6]
+    if not t:
+        raise ValueError(f"Unknown grid: spacing {_spacing(lat)} {_spacing(lon)}")
+    t = t[0]
+
+    # Offset from the t grid, as a fraction of the spacing
+    lat_offset = numpy.mod(t.lat_index(numpy.ravel(lat)[0]), 1)
+    lon_offset = numpy.mod(t.lon_index(numpy.ravel(lon)[0]), 1)
+
+    if abs(lon_offset - 0.5) < 0.25:
+        stagger = "u"
+    elif abs(lat_offset - 0.5) < 0.25:
+        stagger = "v"
+    else:
+        stagger = "t"
+
+    return grids[f"{t.resolution}{stagger}"]
+
+
+def sel(data, latitude=None, longitude=None):
+    """
+    Select from Aus400 data by latitude and longitude
+
+    Uses :meth:`Grid.sel` if the grid of 'data' is known, otherwise
+    :meth:`xarray.Dataset.sel` (with the nearest point for values)
+
+    Args:
+        data: :obj:`xarray.DataArray` or :obj:`xarray.Dataset`
+        latitude: Latitude value, array or slice
+        longitude: Longitude value, array or slice
+
+    Returns:
+        The selected part of 'data'
+    """
+    try:
+        grid = identify(data)
+    except (ValueError, KeyError):
+        grid = None
+
+    if grid is not None:
+        return grid.sel(data, latitude=latitude, longitude=longitude)
+
+    for dim, value in [("latitude", latitude), ("longitude", longitude)]:
+        if value is None:
+            continue
+        if isinstance(value, slice):
+            data = data.sel({dim: value})
+        else:
+            data = data.sel({dim: value}, method="nearest")
+
+    return data
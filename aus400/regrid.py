@@ -29,14 +29,38 @@ spacing E-W from 'd0036u' and N-S from 'd0036v'.
 The default regridding uses bilinear interpolation. For custom regridding grid
 definitions may be found in the 'grids/' directory of the Aus400 published
 dataset, for use by e.g. ESMF_RegridWeightGen.
+
+Weights read from the 'grids/' directory are kept in memory as a sparse
+operator, see :func:`regrid_weights`, so regridding many fields in a loop only
+reads each weights file once.
+
+As the Aus400 grids are regular in latitude and longitude, bilinear weights
+between them are separable into one interpolation along latitude and one
+along longitude. :func:`bilinear_weights` builds these for any pair of
+rectilinear grids, which needs only kilobytes of memory and no weights file.
+:func:`to_d0198` and :func:`to_resolution` use them.
+
+Data may also be sampled at scattered points with :func:`to_points` and
+:class:`RegridPlan`.
 """
 
+import functools
+import threading
+import uuid
+
+import dask
+import dask.array
 import xarray
-from climtas.regrid import regrid
-from .cat import root, load_var
+import scipy.sparse
+from . import cat
+from . import grids
 import numpy
 import pandas
 
+# Weights read by regrid_weights(), by (root, source grid, target grid)
+_weights_cache = {}
+_weights_lock = threading.Lock()
+
 
 def identify_subgrid(data):
     """
@@ -48,35 +72,7 @@ def identify_subgrid(data):
     Returns:
         :obj:`str` with subgrid id of data ('t','u' or 'v')
     """
-    # Need to check lat/lon sizes in the case of zonal/meridional cross-sections
-    
-    if data["latitude"].size > 1:
-        dlat = abs(data["latitude"].values[1] - data["latitude"].values[0])
-        lat_offset = data["latitude"].values[0] - -27.8        
-    else:
-        dlat = 0
-        lat_offset = data["latitude"].values - -27.8  
-        
-    if data["longitude"].size > 1:
-        dlon = abs(data["longitude"].values[1] - data["longitude"].values[0])
-        lon_offset = data["longitude"].values[0] - 133.26
-    else:
-        dlon = 0
-        lon_offset = data["longitude"].values - 133.26
-        
-    delta = round(max(dlat,dlon) * 10000) / 10000
-
-    lat_offset = numpy.mod(lat_offset, delta)
-    lon_offset = numpy.mod(lon_offset, delta)
-
-    if abs(lon_offset - delta / 2) < 0.0001:
-        grid = "u"
-    elif abs(lat_offset - delta / 2) < 0.0001:
-        grid = "v"
-    else:
-        grid = "t"
-
-    return grid
+    return grids.identify(data).stagger
 
 
 def identify_resolution(data: xarray.Dataset):
@@ -89,53 +85,794 @@ def identify_resolution(data: xarray.Dataset):
     Returns:
         :obj:`str` with resolution id of 'data'
     """
+    return grids.identify(data).resolution
 
-    if data["latitude"].size > 1:
-        dlat = abs(data["latitude"].values[1] - data["latitude"].values[0])
-    else:
-        dlat = 0
 
-    lat_res = f"d{round(dlat*10000):04d}"
+def identify_grid(data: xarray.Dataset):
+    """
+    Identify the grid of an Aus400 variable
+
+    See :func:`aus400.grids.identify`
 
-    # also consider longitude resolution in the case of cross-sectioned data
-    # assuming the no. of points is automatic, at least one of lat/lon should have
-    # the same resolution as before
-    if data["longitude"].size > 1:
-        dlon = abs(data["longitude"].values[1] - data["longitude"].values[0])
-    else:
-        dlon = 0
+    Args:
+        data: Variable to identify
 
-    lon_res = f"d{round(dlon*10000):04d}"
+    Returns:
+        :obj:`str` with grid id of 'data'
+    """
+    return grids.identify(data).name
 
-    if lat_res not in ["d0198", "d0036"] and lon_res not in ["d0198", "d0036"]:
-        raise Exception(f"Unknown grid: spacing {dlat} {dlon}")
 
-    return max(lat_res, lon_res)
+class RegridWeights:
+    """
+    Regridding weights from one grid to another, as a sparse operator
 
+    Use :func:`regrid_weights` to get the weights between two Aus400 grids,
+    and :func:`apply_weights` to regrid data with them.
 
-def identify_grid(data: xarray.Dataset):
+    Attributes:
+        matrix: :obj:`scipy.sparse.csr_matrix` of shape (target points,
+            source points), over the flattened (latitude, longitude) grids
+        source_shape: (latitude, longitude) shape of the source grid
+        latitude: Latitudes of the target grid
+        longitude: Longitudes of the target grid
     """
-    Identify the grid of an Aus400 variable
+
+    def __init__(self, matrix, source_shape, latitude, longitude):
+        self.matrix = scipy.sparse.csr_matrix(matrix)
+        self.source_shape = tuple(source_shape)
+        self.latitude = numpy.asarray(latitude)
+        self.longitude = numpy.asarray(longitude)
+
+        # Target points with no source points are set to NaN
+        self._empty = numpy.diff(self.matrix.indptr) == 0
+
+        # Dask handles to the weights, by distributed client id. The token
+        # names the weights in Dask graphs without hashing the matrix
+        self._token = uuid.uuid4().hex
+        self._handles = {}
+        self._handles_lock = threading.Lock()
+
+    @classmethod
+    def from_esmf(cls, weights: xarray.Dataset):
+        """
+        Create from weights made by ESMF_RegridWeightGen
+
+        Args:
+            weights: ESMF weights file, opened with :func:`xarray.open_dataset`
+
+        Returns:
+            :obj:`RegridWeights`
+        """
+        # ESMF grid dims are in Fortran order (longitude, latitude), and
+        # 'row'/'col' are 1-based indices into the target/source grids
+        nx_a, ny_a = weights["src_grid_dims"].values
+        nx_b, ny_b = weights["dst_grid_dims"].values
+
+        matrix = scipy.sparse.csr_matrix(
+            (
+                weights["S"].values,
+                (weights["row"].values - 1, weights["col"].values - 1),
+            ),
+            shape=(weights.sizes["n_b"], weights.sizes["n_a"]),
+        )
+
+        lat = weights["yc_b"].values.reshape(ny_b, nx_b)[:, 0]
+        lon = weights["xc_b"].values.reshape(ny_b, nx_b)[0, :]
+
+        return cls(matrix, (ny_a, nx_a), lat, lon)
+
+    @property
+    def target_shape(self):
+        """
+        (latitude, longitude) shape of the target grid
+        """
+        return (self.latitude.size, self.longitude.size)
+
+    def apply(self, values: numpy.ndarray) -> numpy.ndarray:
+        """
+        Regrid a numpy array with (latitude, longitude) as its last dimensions
+
+        All the horizontal slices of 'values' are regridded together, as a
+        single sparse-dense matrix product
+
+        Args:
+            values: Array to regrid
+
+        Returns:
+            :obj:`numpy.ndarray` on the target grid
+        """
+        values = numpy.asarray(values)
+        lead = values.shape[:-2]
+        dtype = numpy.result_type(values.dtype, numpy.float32)
+
+        # Stack the slices as columns of a (source points, slices) matrix
+        stacked = values.reshape(-1, values.shape[-2] * values.shape[-1])
+        stacked = numpy.ascontiguousarray(stacked.T)
+
+        out = (self.matrix @ stacked).astype(dtype, copy=False)
+        out[self._empty, :] = numpy.nan
+
+        return out.T.reshape(lead + self.target_shape)
+
+    def handle(self):
+        """
+        The weights as a Dask object, for use as an argument to Dask tasks
+
+        The handle is a single key in the Dask graph, so the weights are only
+        sent once no matter how many tasks use them. If a Dask distributed
+        client is active the weights are scattered to every worker when the
+        handle is first made, and the handle is kept for later calls.
+
+        Returns:
+            :obj:`dask.delayed.Delayed` evaluating to this object
+        """
+        try:
+            from dask.distributed import default_client
+
+            client = default_client()
+        except (ImportError, ValueError):
+            client = None
+
+        key = None if client is None else client.id
+
+        with self._handles_lock:
+            if key not in self._handles:
+                if client is None:
+                    handle = dask.delayed(self, name=f"regrid-weights-{self._token}")
+                else:
+                    future = client.scatter(self, broadcast=True, hash=False)
+                    handle = dask.delayed(_identity, pure=True)(future)
+
+                self._handles[key] = handle
+
+            return self._handles[key]
+
+    def __getstate__(self):
+        # Dask handles are local to this process
+        state = dict(self.__dict__)
+        state["_handles"] = {}
+        if "_tiles" in state:
+            state["_tiles"] = {}
+        del state["_handles_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._handles_lock = threading.Lock()
+
+    def __dask_tokenize__(self):
+        return self._token
+
+
+def _identity(x):
+    return x
+
+
+class SeparableWeights(RegridWeights):
+    """
+    Regridding weights that are the product of weights along latitude and
+    along longitude
+
+    The full weights are the Kronecker product of :attr:`lat_matrix` and
+    :attr:`lon_matrix`, but are never stored. Use :func:`bilinear_weights` to
+    create them.
+
+    Attributes:
+        lat_matrix: :obj:`scipy.sparse.csr_matrix` of shape (target
+            latitudes, source latitudes)
+        lon_matrix: :obj:`scipy.sparse.csr_matrix` of shape (target
+            longitudes, source longitudes)
+        source_shape: (latitude, longitude) shape of the source grid
+        latitude: Latitudes of the target grid
+        longitude: Longitudes of the target grid
+    """
+
+    def __init__(self, lat_matrix, lon_matrix, latitude, longitude):
+        self.lat_matrix = scipy.sparse.csr_matrix(lat_matrix)
+        self.lon_matrix = scipy.sparse.csr_matrix(lon_matrix)
+        self.source_shape = (self.lat_matrix.shape[1], self.lon_matrix.shape[1])
+        self.latitude = numpy.asarray(latitude)
+        self.longitude = numpy.asarray(longitude)
+
+        # Target points with no source points are set to NaN
+        self._empty_lat = numpy.diff(self.lat_matrix.indptr) == 0
+        self._empty_lon = numpy.diff(self.lon_matrix.indptr) == 0
+
+        self._token = uuid.uuid4().hex
+        self._handles = {}
+        self._handles_lock = threading.Lock()
+
+        # Tiles made by _tile(), shared between calls
+        self._tiles = {}
+
+    @property
+    def matrix(self):
+        """
+        The full weights over the flattened grids, as :obj:`RegridWeights`
+        uses. This may be very large.
+        """
+        return scipy.sparse.kron(self.lat_matrix, self.lon_matrix, format="csr")
+
+    def apply(self, values: numpy.ndarray) -> numpy.ndarray:
+        """
+        Regrid a numpy array with (latitude, longitude) as its last dimensions
+
+        All the horizontal slices of 'values' are regridded together, with one
+        sparse matrix product along longitude then one along latitude
+
+        Args:
+            values: Array to regrid
+
+        Returns:
+            :obj:`numpy.ndarray` on the target grid
+        """
+        values = numpy.asarray(values)
+        lead = values.shape[:-2]
+        dtype = numpy.result_type(values.dtype, numpy.float32)
+
+        ny, nx = values.shape[-2:]
+        my, mx = self.target_shape
+
+        # Along longitude, with (source longitude, slices * latitudes) columns
+        stacked = numpy.ascontiguousarray(values.reshape(-1, nx).T)
+        out = self.lon_matrix @ stacked
+
+        # Along latitude, with (source latitude, slices * longitudes) columns
+        out = out.reshape(mx, -1, ny).transpose(2, 1, 0).reshape(ny, -1)
+        out = (self.lat_matrix @ out).astype(dtype, copy=False)
+
+        out = out.reshape(my, -1, mx).transpose(1, 0, 2)
+        out[:, self._empty_lat, :] = numpy.nan
+        out[:, :, self._empty_lon] = numpy.nan
+
+        return out.reshape(lead + self.target_shape)
+
+    def _tile(self, j0, j1, l0, l1):
+        """
+        Weights to the target points [j0:j1, l0:l1], using only the source
+        points they need
+
+        Returns:
+            (weights, source latitude slice, source longitude slice), with
+            weights None if the tile is outside of the source grid
+        """
+        key = (j0, j1, l0, l1)
+
+        if key not in self._tiles:
+            lat_w = self.lat_matrix[j0:j1]
+            lon_w = self.lon_matrix[l0:l1]
+            i0, i1 = _column_range(lat_w)
+            k0, k1 = _column_range(lon_w)
+
+            tile = None
+            if i0 < i1 and k0 < k1:
+                tile = type(self)(
+                    lat_w[:, i0:i1],
+                    lon_w[:, k0:k1],
+                    self.latitude[j0:j1],
+                    self.longitude[l0:l1],
+                )
+
+            self._tiles[key] = (tile, slice(i0, i1), slice(k0, k1))
+
+        return self._tiles[key]
+
+
+def _linear_weights(source: numpy.ndarray, target: numpy.ndarray):
+    """
+    1d linear interpolation weights from 'source' to 'target' coordinates
+
+    Targets outside of the source range get no weights
+    """
+    ascending = source[-1] >= source[0]
+    if not ascending:
+        source = source[::-1]
+
+    upper = numpy.clip(numpy.searchsorted(source, target), 1, source.size - 1)
+    lower = upper - 1
+    frac = (target - source[lower]) / (source[upper] - source[lower])
+
+    # Allow for rounding in the coordinates at the boundary
+    tol = 1e-6 * abs(source[-1] - source[0]) / max(source.size - 1, 1)
+    inside = (target >= source[0] - tol) & (target <= source[-1] + tol)
+    frac = numpy.clip(frac, 0, 1)
+
+    if not ascending:
+        lower = source.size - 1 - lower
+        upper = source.size - 1 - upper
+
+    rows = numpy.arange(target.size)[inside]
+    matrix = scipy.sparse.csr_matrix(
+        (
+            numpy.concatenate([1 - frac[inside], frac[inside]]),
+            (
+                numpy.concatenate([rows, rows]),
+                numpy.concatenate([lower[inside], upper[inside]]),
+            ),
+        ),
+        shape=(target.size, source.size),
+    )
+
+    # Don't store zero weights, so NaNs at those points aren't spread
+    matrix.eliminate_zeros()
+
+    return matrix
+
+
+@functools.lru_cache(maxsize=32)
+def _bilinear_weights(source_lat, source_lon, target_lat, target_lon):
+    def coord(b):
+        return numpy.frombuffer(b, dtype="float64")
+
+    return SeparableWeights(
+        _linear_weights(coord(source_lat), coord(target_lat)),
+        _linear_weights(coord(source_lon), coord(target_lon)),
+        coord(target_lat),
+        coord(target_lon),
+    )
+
+
+def bilinear_weights(source_lat, source_lon, target_lat, target_lon):
+    """
+    Bilinear regridding weights between two rectilinear grids
+
+    The weights are built from the coordinates, so no weights file is needed.
+    Target points outside of the source grid are set to NaN. Recently used
+    weights are kept, so calling this again with the same grids is cheap.
 
     Args:
-        data: Variable to identify
+        source_lat: Latitudes of the source grid
+        source_lon: Longitudes of the source grid
+        target_lat: Latitudes of the target grid
+        target_lon: Longitudes of the target grid
 
     Returns:
-        :obj:`str` with grid id of 'data'
+        :obj:`SeparableWeights`
+    """
+
+    def key(c):
+        return numpy.ascontiguousarray(c, dtype="float64").tobytes()
+
+    return _bilinear_weights(
+        key(source_lat), key(source_lon), key(target_lat), key(target_lon)
+    )
+
+
+class ConservativeWeights(SeparableWeights):
+    """
+    First order conservative regridding weights, see
+    :func:`conservative_weights`
+
+    Each target cell is the area weighted mean of the source cells it
+    overlaps. Missing (NaN) source values are left out of the mean, target
+    cells with no valid source values are NaN.
+    """
+
+    def apply(self, values: numpy.ndarray) -> numpy.ndarray:
+        values = numpy.asarray(values)
+        valid = ~numpy.isnan(values)
+
+        # Sum of valid values, and the fraction of each target cell they cover
+        total = super().apply(numpy.where(valid, values, 0))
+        frac = super().apply(valid.astype(total.dtype))
+
+        with numpy.errstate(invalid="ignore", divide="ignore"):
+            return numpy.where(frac > 0, total / frac, numpy.nan).astype(total.dtype)
+
+
+def _cell_bounds(centres: numpy.ndarray) -> numpy.ndarray:
+    """
+    Cell edges of a 1d grid, half way between the centres
+    """
+    if centres.size < 2:
+        raise ValueError("Need at least two points to find cell bounds")
+
+    mid = (centres[1:] + centres[:-1]) / 2
+    return numpy.concatenate(
+        [[2 * centres[0] - mid[0]], mid, [2 * centres[-1] - mid[-1]]]
+    )
+
+
+def _overlap_weights(source: numpy.ndarray, target: numpy.ndarray, measure=None):
+    """
+    1d conservative weights from cells centred at 'source' to cells centred
+    at 'target'
+
+    Each weight is the overlap of a source and target cell as a fraction of
+    the part of the target cell covered by the source grid. 'measure' maps
+    coordinates to a distance, e.g. sin(latitude) for an area weighting.
+    """
+    src = _cell_bounds(source)
+    tgt = _cell_bounds(target)
+
+    if measure is not None:
+        src = measure(src)
+        tgt = measure(tgt)
+
+    ascending = src[-1] >= src[0]
+    if not ascending:
+        src = src[::-1]
+
+    lo = numpy.minimum(tgt[:-1], tgt[1:])
+    hi = numpy.maximum(tgt[:-1], tgt[1:])
+
+    # Range of source cells that may overlap each target cell
+    first = numpy.clip(numpy.searchsorted(src, lo, side="right") - 1, 0, source.size)
+    last = numpy.clip(numpy.searchsorted(src, hi, side="left"), 0, source.size)
+    count = numpy.maximum(last - first, 0)
+
+    rows = numpy.repeat(numpy.arange(target.size), count)
+    cols = first[rows] + numpy.arange(rows.size) - numpy.repeat(
+        numpy.cumsum(count) - count, count
+    )
+
+    overlap = numpy.minimum(hi[rows], src[cols + 1]) - numpy.maximum(
+        lo[rows], src[cols]
+    )
+    keep = overlap > 0
+    rows, cols, overlap = rows[keep], cols[keep], overlap[keep]
+
+    if not ascending:
+        cols = source.size - 1 - cols
+
+    covered = numpy.bincount(rows, weights=overlap, minlength=target.size)
+
+    return scipy.sparse.csr_matrix(
+        (overlap / covered[rows], (rows, cols)), shape=(target.size, source.size)
+    )
+
+
+def _sin_lat(lat):
+    return numpy.sin(numpy.radians(numpy.clip(lat, -90, 90)))
+
+
+@functools.lru_cache(maxsize=32)
+def _conservative_weights(source_lat, source_lon, target_lat, target_lon):
+    def coord(b):
+        return numpy.frombuffer(b, dtype="float64")
+
+    return ConservativeWeights(
+        _overlap_weights(coord(source_lat), coord(target_lat), _sin_lat),
+        _overlap_weights(coord(source_lon), coord(target_lon)),
+        coord(target_lat),
+        coord(target_lon),
+    )
+
+
+def conservative_weights(source_lat, source_lon, target_lat, target_lon):
+    """
+    First order conservative regridding weights between two rectilinear grids
+
+    Cells are bounded half way between the grid points. On a latitude-
+    longitude grid the area of overlap between two cells is the product of
+    their overlap in longitude and in sin(latitude), so the weights are
+    separable like :func:`bilinear_weights`, and exact for any ratio of grid
+    spacings (e.g. 0.0198 / 0.0036 = 5.5).
+
+    Use this for quantities like precipitation and fluxes, where area
+    integrals should be kept. Recently used weights are kept, so calling this
+    again with the same grids is cheap.
+
+    Args:
+        source_lat: Latitudes of the source grid
+        source_lon: Longitudes of the source grid
+        target_lat: Latitudes of the target grid
+        target_lon: Longitudes of the target grid
+
+    Returns:
+        :obj:`ConservativeWeights`
+    """
+
+    def key(c):
+        return numpy.ascontiguousarray(c, dtype="float64").tobytes()
+
+    return _conservative_weights(
+        key(source_lat), key(source_lon), key(target_lat), key(target_lon)
+    )
+
+
+_methods = {"bilinear": bilinear_weights, "conservative": conservative_weights}
+
+
+def regular_grid(spacing: float, lat_range, lon_range, origin=None):
+    """
+    Coordinates of a regular grid covering a region
+
+    The grid points are aligned with 'origin', which by default is the first
+    point of the 'd0198t' grid, so e.g. a spacing of 0.0198 gives points of
+    the 'd0198t' grid.
+
+    Args:
+        spacing: Grid spacing in degrees
+        lat_range: (min, max) latitude to cover
+        lon_range: (min, max) longitude to cover
+        origin: (latitude, longitude) of a point on the grid
+
+    Returns:
+        (latitude, longitude) tuple of :obj:`numpy.ndarray`
+    """
+
+    def axis(lo, hi, start):
+        # Allow for rounding in the source coordinates
+        k0 = numpy.ceil((lo - start) / spacing - 1e-6)
+        k1 = numpy.floor((hi - start) / spacing + 1e-6)
+        return start + spacing * numpy.arange(k0, k1 + 1)
+
+    if origin is None:
+        origin = (grids.grids["d0198t"].lat0, grids.grids["d0198t"].lon0)
+
+    return (
+        axis(*lat_range, origin[0]),
+        axis(*lon_range, origin[1]),
+    )
+
+
+def to_grid(data, latitude, longitude, method: str = "bilinear"):
+    """
+    Regrid an Aus400 variable to any rectilinear grid
+
+    Args:
+        data: Variable to regrid
+        latitude: Latitudes of the target grid
+        longitude: Longitudes of the target grid
+        method: 'bilinear' (see :func:`bilinear_weights`) or 'conservative'
+            (see :func:`conservative_weights`)
+
+    Returns:
+        'data' on the target grid
+    """
+    if method not in _methods:
+        raise ValueError(
+            f"Unknown regrid method '{method}', expected one of " + ", ".join(_methods)
+        )
+
+    weights = _methods[method](
+        data["latitude"].values, data["longitude"].values, latitude, longitude
+    )
+
+    return apply_weights(data, weights)
+
+
+def to_resolution(data, spacing: float, method: str = "bilinear"):
+    """
+    Regrid an Aus400 variable to a regular grid, e.g. 0.05 or 0.1 degrees
+
+    The target grid covers the same region as 'data', with its points aligned
+    to the 'd0198t' grid (see :func:`regular_grid`)
+
+    Args:
+        data: Variable to regrid
+        spacing: Target grid spacing in degrees
+        method: 'bilinear' or 'conservative', see :func:`to_grid`
+
+    Returns:
+        'data' on the target grid
+    """
+    lat = data["latitude"].values
+    lon = data["longitude"].values
+
+    latitude, longitude = regular_grid(
+        spacing, (lat.min(), lat.max()), (lon.min(), lon.max())
+    )
+
+    return to_grid(data, latitude, longitude, method=method)
+
+
+def regrid_weights(source: str, target: str) -> RegridWeights:
+    """
+    Weights to regrid between two Aus400 grids
+
+    Weights are read from the 'grids/' directory of the Aus400 dataset the
+    first time they are used, then kept in memory and shared between calls
+    and threads.
+
+    Args:
+        source: Source grid id, e.g. 'd0036u'
+        target: Target grid id, e.g. 'd0198t'
+
+    Returns:
+        :obj:`RegridWeights`
+    """
+    key = (str(cat.root), source, target)
+
+    with _weights_lock:
+        if key not in _weights_cache:
+            path = cat.root / "grids" / f"weights_{source}_to_{target}.nc"
+            with xarray.open_dataset(path) as weights:
+                _weights_cache[key] = RegridWeights.from_esmf(weights)
+
+        return _weights_cache[key]
+
+
+def clear_weights_cache():
     """
+    Remove all weights from the :func:`regrid_weights`,
+    :func:`bilinear_weights` and :func:`conservative_weights` caches
+    """
+    with _weights_lock:
+        _weights_cache.clear()
+
+    _bilinear_weights.cache_clear()
+    _conservative_weights.cache_clear()
+
 
-    res = identify_resolution(data)
-    grid = identify_subgrid(data)
+def _apply_block(block, weights):
+    return weights.apply(block)
 
-    return f"{res}{grid}"
 
+def _column_range(matrix):
+    """
+    (start, stop) of the columns of a sparse matrix with non-zero values
+    """
+    if matrix.nnz == 0:
+        return 0, 0
+    return matrix.indices.min(), matrix.indices.max() + 1
+
+
+def _apply_tiled(source, weights: SeparableWeights, dtype):
+    """
+    Regrid Dask array 'source' one horizontal tile of the target grid at a
+    time
 
-def to_d0198(data: xarray.Dataset):
+    Each target tile only reads the part of 'source' its weights cover, and
+    the tiles are sized so that this is about one horizontal source chunk
+    """
+    ny, nx = source.shape[-2:]
+    my, mx = weights.target_shape
+    lead = source.chunks[:-2]
+
+    ty = max(1, source.chunks[-2][0] * my // ny)
+    tx = max(1, source.chunks[-1][0] * mx // nx)
+
+    rows = []
+    for j0 in range(0, my, ty):
+        row = []
+        for l0 in range(0, mx, tx):
+            tile, src_y, src_x = weights._tile(j0, j0 + ty, l0, l0 + tx)
+
+            shape = (min(my, j0 + ty) - j0, min(mx, l0 + tx) - l0)
+            chunks = lead + tuple((n,) for n in shape)
+
+            if tile is None:
+                # Outside of the source grid
+                row.append(
+                    dask.array.full(
+                        source.shape[:-2] + shape,
+                        numpy.nan,
+                        chunks=chunks,
+                        dtype=dtype,
+                    )
+                )
+                continue
+
+            block = source[..., src_y, src_x].rechunk(
+                {source.ndim - 2: -1, source.ndim - 1: -1}
+            )
+            row.append(
+                dask.array.map_blocks(
+                    _apply_block,
+                    block,
+                    tile,
+                    chunks=chunks,
+                    meta=numpy.array((), dtype=dtype),
+                )
+            )
+
+        rows.append(row)
+
+    return dask.array.block(rows)
+
+
+def apply_weights(data, weights: RegridWeights):
+    """
+    Regrid an Aus400 variable using pre-computed weights
+
+    Dask data is regridded lazily. For weights read from a file each chunk
+    holds the full horizontal domain, and as many slices of the other
+    dimensions (time, level, ensemble) as fit in Dask's 'array.chunk-size'
+    setting, which are regridded together in one sparse matrix product. The
+    products release the GIL, so chunks are regridded in parallel by the
+    threaded scheduler.
+
+    Separable weights (e.g. from :func:`bilinear_weights` or
+    :func:`conservative_weights`) are instead applied one tile of the target
+    grid at a time, each reading only the source chunks it overlaps. Memory
+    use is then bounded by the input chunk size, even for full domain fields.
+
+    Args:
+        data: :obj:`xarray.DataArray` or :obj:`xarray.Dataset` to regrid
+        weights: Weights from :func:`regrid_weights`
+
+    Returns:
+        'data' on the target grid of 'weights'
+    """
+    horizontal = ["latitude", "longitude"]
+
+    if isinstance(data, xarray.Dataset):
+        return data.map(
+            lambda v: apply_weights(v, weights)
+            if all(d in v.dims for d in horizontal)
+            else v,
+            keep_attrs=True,
+        )
+
+    dims = [d for d in data.dims if d not in horizontal] + horizontal
+    data = data.transpose(*dims)
+
+    if data.shape[-2:] != weights.source_shape:
+        raise ValueError(
+            f"Data has horizontal shape {data.shape[-2:]}, but the weights "
+            + f"expect {weights.source_shape}"
+        )
+
+    dtype = numpy.result_type(data.dtype, numpy.float32)
+
+    if isinstance(data.data, dask.array.Array) and isinstance(
+        weights, SeparableWeights
+    ):
+        values = _apply_tiled(data.data, weights, dtype)
+    elif isinstance(data.data, dask.array.Array):
+        chunks = {i: "auto" for i in range(data.ndim - 2)}
+        chunks.update({data.ndim - 2: -1, data.ndim - 1: -1})
+        source = data.data.rechunk(chunks)
+        values = dask.array.map_blocks(
+            _apply_block,
+            source,
+            weights.handle(),
+            chunks=source.chunks[:-2] + tuple((n,) for n in weights.target_shape),
+            meta=numpy.array((), dtype=dtype),
+        )
+    else:
+        values = weights.apply(data.values)
+
+    coords = {
+        k: v
+        for k, v in data.coords.items()
+        if not any(d in v.dims for d in horizontal)
+    }
+    coords["latitude"] = ("latitude", weights.latitude, data["latitude"].attrs)
+    coords["longitude"] = ("longitude", weights.longitude, data["longitude"].attrs)
+
+    # The output is no longer on the source grid
+    attrs = {k: v for k, v in data.attrs.items() if k != "grid"}
+
+    return xarray.DataArray(
+        values, dims=dims, coords=coords, name=data.name, attrs=attrs
+    )
+
+
+def _tag_grid(data, grid: str):
+    """
+    Set the 'grid' attribute of 'data', see :func:`aus400.grids.identify`
+    """
+    data = data.copy()
+
+    if isinstance(data, xarray.Dataset):
+        for v in data.data_vars.values():
+            if "latitude" in v.dims and "longitude" in v.dims:
+                v.attrs["grid"] = grid
+    else:
+        data.attrs["grid"] = grid
+
+    return data
+
+
+def to_d0198(data: xarray.Dataset, method: str = "bilinear"):
     """
     Regrid an Aus400 variable to the 2.2km t (scalar) grid
 
+    The weights are computed from the grid coordinates (see
+    :func:`bilinear_weights` and :func:`conservative_weights`), so any region
+    of the Aus400 grids may be regridded. The output covers only the
+    'd0198t' points within the region of 'data', rather than the full
+    'd0198t' domain, so regridding a subset stays small. To get the full
+    domain pass its coordinates to :func:`to_grid`, points outside of 'data'
+    are then NaN.
+
     Args:
         data: Variable to regrid
+        method: 'bilinear' or 'conservative', see :func:`to_grid`
 
     Returns:
         :obj:`xarray.Dataset` with 'data' on the 'd0198t' grid
@@ -145,9 +882,14 @@ def to_d0198(data: xarray.Dataset):
     if grid == "d0198t":
         return data
 
-    weights = xarray.open_dataset(root / "grids" / f"weights_{grid}_to_d0198t.nc")
+    lat = data["latitude"].values
+    lon = data["longitude"].values
+
+    latitude, longitude = grids.grids["d0198t"].region(
+        (lat.min(), lat.max()), (lon.min(), lon.max())
+    )
 
-    return regrid(data, weights=weights)
+    return _tag_grid(to_grid(data, latitude, longitude, method=method), "d0198t")
 
 
 def to_barra(data: xarray.Dataset):
@@ -162,61 +904,360 @@ def to_barra(data: xarray.Dataset):
     """
     grid = identify_grid(data)
 
-    if grid == "d0198t":
-        return data
+    return apply_weights(data, regrid_weights(grid, "barrat"))
+
 
-    weights = xarray.open_dataset(root / "grids" / f"weights_{grid}_to_barrat.nc")
+def regrid_all(results, target="d0198t", method: str = "bilinear", store=None):
+    """
+    Regrid many variables, e.g. the results of :func:`aus400.cat.load_all`,
+    to a common grid
 
-    return regrid(data, weights=weights)
+    Variables on the same source grid and region share one set of weights,
+    and everything is regridded lazily so that the whole job is a single Dask
+    graph. If 'store' is given the results are written to it in one compute,
+    each variable to a Zarr group named by its key.
 
+    Args:
+        results: Dict of :obj:`xarray.Dataset`, like the output of
+            :func:`aus400.cat.load_all`
+        target: Target grid, as an id (e.g. 'd0198t'), a
+            :class:`aus400.grids.Grid` or a (latitude, longitude) tuple
+        method: 'bilinear' or 'conservative', see :func:`to_grid`
+        store: Zarr store or path to write the results to
 
-def regrid_vector(data):
+    Returns:
+        Dict of regridded :obj:`xarray.Dataset`, with the same keys as
+        'results'
+    """
+    if method not in _methods:
+        raise ValueError(
+            f"Unknown regrid method '{method}', expected one of " + ", ".join(_methods)
+        )
+
+    if isinstance(target, str):
+        target = grids.grids[target]
+
+    # Group the variables by source grid and region
+    groups = {}
+    for name, ds in results.items():
+        lat = numpy.ascontiguousarray(ds["latitude"].values, dtype="float64")
+        lon = numpy.ascontiguousarray(ds["longitude"].values, dtype="float64")
+        groups.setdefault((lat.tobytes(), lon.tobytes()), []).append(name)
+
+    out = {}
+    for names in groups.values():
+        first = results[names[0]]
+        lat = first["latitude"].values
+        lon = first["longitude"].values
+
+        if isinstance(target, grids.Grid):
+            if grids.identify(first) == target:
+                out.update({n: results[n] for n in names})
+                continue
+
+            latitude, longitude = target.region(
+                (lat.min(), lat.max()), (lon.min(), lon.max())
+            )
+        else:
+            latitude, longitude = target
+
+        weights = _methods[method](lat, lon, latitude, longitude)
+
+        for n in names:
+            ds = apply_weights(results[n], weights)
+            if isinstance(target, grids.Grid):
+                ds = _tag_grid(ds, target.name)
+            out[n] = ds
+
+    if store is not None:
+        writes = [
+            ds.to_zarr(store, group=name, mode="w", compute=False)
+            for name, ds in out.items()
+        ]
+        dask.compute(*writes)
+
+    return {n: out[n] for n in results}
+
+
+class RegridPlan:
     """
-    Redrigs vector quantities like u/v defined on grid edges to the
-    scalar grid on gridpoint centres (same resolution as original)
+    Bilinear interpolation from an Aus400 grid to a set of points, e.g. radar
+    gates, flight tracks or satellite footprints
 
-    Currently cannot regrid cross-sections of vector quantities --
-    these must be regridded first before taking the cross-section afterwards.
-    (this is because the cross-sections can mess with lat/lon spacing)
+    The grid cell containing each point and its interpolation weights are
+    found once when the plan is made, using the grid geometry rather than a
+    search of the coordinates. Applying the plan to data is then a gather of
+    the four corners of each cell and a weighted sum, for every time step and
+    level at once.
 
-    will need to load a 'dummy' variable to get the coordinates
-    of the gridpoint centres at the same resolution as input data
-    - might be able to just use grids in /g/data instead?
-    -- > these are actually different from the variable grids (?)
+    A plan may be applied to any region of its grid, points outside of the
+    region are NaN. Plans may be pickled, e.g. to send to Dask workers.
+
+    Args:
+        grid: Source grid, e.g. ``aus400.grids.grids["d0036t"]``
+        latitude: Latitudes of the points
+        longitude: Longitudes of the points
+        dims: Dimension names of the points, if 'latitude' and 'longitude'
+            have more than one dimension (default 'point')
 
-    Inputs:
-        data: input data
-    Outputs:
-        data_regrid: regridded data
+    Attributes:
+        grid: Source :class:`aus400.grids.Grid`
+        latitude: Latitudes of the points
+        longitude: Longitudes of the points
+        dims: Dimension names of the points
     """
 
-    res = identify_resolution(data)
-    sub = identify_subgrid(data)
+    def __init__(self, grid: grids.Grid, latitude, longitude, dims=None):
+        latitude, longitude = numpy.broadcast_arrays(
+            numpy.atleast_1d(numpy.asarray(latitude, dtype="float64")),
+            numpy.atleast_1d(numpy.asarray(longitude, dtype="float64")),
+        )
+
+        if dims is None:
+            if latitude.ndim > 1:
+                raise ValueError("Give 'dims' for multi-dimensional points")
+            dims = ("point",)
+
+        self.grid = grid
+        self.latitude = latitude
+        self.longitude = longitude
+        self.dims = tuple(dims)
+
+        ny, nx = grid.shape
+        fy = grid.lat_index(latitude.ravel())
+        fx = grid.lon_index(longitude.ravel())
+
+        # Snap points on a grid line, allowing for rounding, so they always
+        # get a weight of 0 or 1
+        fy = numpy.where(numpy.abs(fy - numpy.rint(fy)) < 1e-6, numpy.rint(fy), fy)
+        fx = numpy.where(numpy.abs(fx - numpy.rint(fx)) < 1e-6, numpy.rint(fx), fx)
+
+        # Lower left corner of each cell, and the position within the cell
+        self._iy = numpy.clip(numpy.floor(fy), 0, ny - 2).astype("int64")
+        self._ix = numpy.clip(numpy.floor(fx), 0, nx - 2).astype("int64")
+        wy = fy - self._iy
+        wx = fx - self._ix
+
+        # Allow for rounding at the edges of the grid
+        self._outside = (wy < -1e-6) | (wy > 1 + 1e-6) | (wx < -1e-6) | (wx > 1 + 1e-6)
+
+        # Points on a grid row or column, which may be the edge of a region
+        self._on_row = numpy.abs(wy) < 1e-6
+        self._on_col = numpy.abs(wx) < 1e-6
+
+        self._weights = numpy.stack(
+            [(1 - wy) * (1 - wx), (1 - wy) * wx, wy * (1 - wx), wy * wx]
+        )
+
+    def apply(self, data):
+        """
+        Interpolate data to the points of the plan
 
-    if 'distance' in data.dims:
-        raise Exception(
-            f"Can't horizontally regrid data on '{sub}' grid, regrid to 't' first"
+        Args:
+            data: :obj:`xarray.DataArray` or :obj:`xarray.Dataset` on the
+                plan's grid
+
+        Returns:
+            'data' at the points, with the horizontal dimensions replaced by
+            :attr:`dims`
+        """
+        horizontal = ["latitude", "longitude"]
+
+        if isinstance(data, xarray.Dataset):
+            return data.map(
+                lambda v: self.apply(v) if all(d in v.dims for d in horizontal) else v,
+                keep_attrs=True,
+            )
+
+        if grids.identify(data) != self.grid:
+            raise ValueError(
+                f"Data is on the '{grids.identify(data).name}' grid, but the "
+                + f"plan is for '{self.grid.name}'"
+            )
+
+        # Offset of 'data' within the grid
+        oy = int(numpy.rint(self.grid.lat_index(data["latitude"].values[0])))
+        ox = int(numpy.rint(self.grid.lon_index(data["longitude"].values[0])))
+        ny, nx = data.sizes["latitude"], data.sizes["longitude"]
+
+        iy = self._iy - oy
+        ix = self._ix - ox
+        weights = self._weights
+
+        # Points on the last row or column of 'data' use the cell before
+        top = self._on_row & (iy == ny - 1)
+        right = self._on_col & (ix == nx - 1)
+        if top.any() or right.any():
+            weights = weights.copy()
+            weights[:, top] = weights[[2, 3, 0, 1]][:, top]
+            weights[:, right] = weights[[1, 0, 3, 2]][:, right]
+            iy = numpy.where(top, iy - 1, iy)
+            ix = numpy.where(right, ix - 1, ix)
+
+        valid = ~self._outside & (iy >= 0) & (iy < ny - 1) & (ix >= 0) & (ix < nx - 1)
+        iy = numpy.where(valid, iy, 0)
+        ix = numpy.where(valid, ix, 0)
+
+        corners = ("_corner", "_point")
+        corner_y = numpy.stack([iy, iy, iy + 1, iy + 1])
+        corner_x = numpy.stack([ix, ix + 1, ix, ix + 1])
+        gathered = data.isel(
+            latitude=xarray.DataArray(corner_y, dims=corners),
+            longitude=xarray.DataArray(corner_x, dims=corners),
         )
 
-    # load the grid to reshape input data to
+        # Corners with no weight don't contribute, even if they're NaN
+        weights = xarray.DataArray(weights, dims=corners)
+        result = xarray.where(weights != 0, gathered * weights, 0).sum(
+            "_corner", skipna=False
+        )
+        result = result.where(xarray.DataArray(valid, dims="_point"))
+
+        lead = [d for d in result.dims if d != "_point"]
+        result = result.transpose(*lead, "_point")
+
+        coords = {
+            k: v
+            for k, v in data.coords.items()
+            if not any(d in v.dims for d in horizontal)
+        }
+        coords["latitude"] = (self.dims, self.latitude)
+        coords["longitude"] = (self.dims, self.longitude)
 
-    grid = load_var(
-        resolution=res,
-        stream="fx",
-        variable="lnd_mask",
+        return xarray.DataArray(
+            result.data.reshape(result.shape[:-1] + self.latitude.shape),
+            dims=lead + list(self.dims),
+            coords=coords,
+            name=data.name,
+            attrs={k: v for k, v in data.attrs.items() if k != "grid"},
+        )
+
+
+def to_points(data, latitude, longitude, dims=None):
+    """
+    Bilinear interpolation of an Aus400 variable to a set of points
+
+    To sample many variables or time steps at the same points, make a
+    :class:`RegridPlan` once and use its :meth:`RegridPlan.apply`.
+
+    Args:
+        data: Variable to regrid
+        latitude: Latitudes of the points
+        longitude: Longitudes of the points
+        dims: Dimension names of the points, see :class:`RegridPlan`
+
+    Returns:
+        'data' at the points
+    """
+    return RegridPlan(grids.identify(data), latitude, longitude, dims).apply(data)
+
+
+def _destagger_block(block, axis):
+    lower = [slice(None)] * block.ndim
+    upper = [slice(None)] * block.ndim
+    lower[axis] = slice(None, -1)
+    upper[axis] = slice(1, None)
+
+    return (block[tuple(lower)] + block[tuple(upper)]) / 2
+
+
+def destagger(values, axis: int):
+    """
+    Average neighbouring points along 'axis', moving staggered values to the
+    points half way between them
+
+    Dask arrays keep their chunks, with each chunk reading a one point halo
+    from the start of the next chunk.
+
+    Args:
+        values: :obj:`numpy.ndarray` or :obj:`dask.array.Array`
+        axis: Axis to average along
+
+    Returns:
+        Array with one fewer point along 'axis'
+    """
+    if axis < 0:
+        axis += values.ndim
+
+    if not isinstance(values, dask.array.Array):
+        return _destagger_block(numpy.asarray(values), axis)
+
+    chunks = list(values.chunks)
+    chunks[axis] = chunks[axis][:-1] + (chunks[axis][-1] - 1,)
+
+    return dask.array.map_overlap(
+        functools.partial(_destagger_block, axis=axis),
+        values,
+        depth={axis: (0, 1)},
+        boundary="none",
+        trim=False,
+        chunks=tuple(chunks),
+        meta=numpy.array((), dtype=numpy.result_type(values.dtype, numpy.float32)),
     )
 
-    # cut lats/lons of grid to that of input
-    grid = grid.sel(latitude=slice(data.latitude.min(), data.latitude.max()))
-    grid = grid.sel(longitude=slice(data.longitude.min(), data.longitude.max()))
 
-    # need to squeeze input data (xr.interp_like doesn't like the exta dims for some reason)
-    squeezed_dims = [dim for dim in data.dims if data[dim].size == 1]
-    data = data.squeeze()
+def regrid_vector(data):
+    """
+    Regrid vector quantities like u/v defined on grid edges to the scalar grid
+    on gridpoint centres (same resolution as original)
 
-    data_regrid = data.interp_like(grid)
+    On the Arakawa C grid the 't' points are half way between neighbouring
+    'u' points along longitude and 'v' points along latitude, so each 't'
+    value is the mean of the two neighbouring values. The output covers the
+    't' points between the first and last input points, so has one fewer
+    point along the staggered dimension. Singleton dimensions are kept.
 
-    # expand dims (any further vertical interpolation needs expanded dims)
-    data_regrid = data_regrid.expand_dims(squeezed_dims)
+    Cross-sections may be regridded if they run along the staggered
+    dimension (zonal sections of 'u', meridional sections of 'v'). Other
+    cross-sections need to be taken from data regridded first.
 
-    return data_regrid
+    Args:
+        data: :obj:`xarray.DataArray` or :obj:`xarray.Dataset` on a 'u' or
+            'v' grid
+
+    Returns:
+        'data' on the 't' grid
+    """
+    if isinstance(data, xarray.Dataset):
+        return data.map(
+            lambda v: regrid_vector(v)
+            if "latitude" in v.coords and "longitude" in v.coords
+            else v,
+            keep_attrs=True,
+        )
+
+    grid = grids.identify(data)
+    sub = grid.stagger
+
+    if sub == "t":
+        return data
+
+    dim = "longitude" if sub == "u" else "latitude"
+
+    if "distance" in data.dims:
+        # Only a section at a single row (u) or column (v) of the grid runs
+        # along the staggered dimension
+        other = "latitude" if dim == "longitude" else "longitude"
+        if data[dim].dims != ("distance",) or data[other].ndim != 0:
+            raise Exception(
+                f"Can't horizontally regrid a cross-section on the '{sub}' grid "
+                + f"unless it runs along {dim}, regrid to 't' first"
+            )
+        dim = "distance"
+
+    values = destagger(data.data, data.get_axis_num(dim))
+
+    coords = {}
+    for k, v in data.coords.items():
+        v = v.variable
+        if dim in v.dims:
+            v = xarray.Variable(
+                v.dims, destagger(v.values, v.get_axis_num(dim)), v.attrs
+            )
+        coords[k] = v
+
+    attrs = {**data.attrs, "grid": f"{grid.resolution}t"}
+
+    return xarray.DataArray(
+        values, dims=data.dims, coords=coords, name=data.name, attrs=attrs
+    )
@@ -24,6 +24,8 @@ from typing import Tuple
 import numpy
 import matplotlib.pyplot as plt
 
+from .grids import grids
+
 
 def to_bytes(array):
     """
@@ -103,7 +105,9 @@ def zoom_region(
         :obj:`PIL.Image.Image` with size 'size'
     """
 
-    if image.size != (13194, 10554):
+    grid = grids["d0036t"]
+
+    if image.size != grid.shape[::-1]:
         raise Exception(
             "Input image has unexpected size, make sure it is on the d0036t grid"
         )
@@ -117,11 +121,12 @@ def zoom_region(
     lat0 = lat - lat_scale / 2
     lat1 = lat + lat_scale / 2
 
-    x0 = int((lon0 - 109.5106) / 0.0036)
-    x1 = int((lon1 - 109.5106) / 0.0036)
+    x0 = int(grid.lon_index(lon0))
+    x1 = int(grid.lon_index(lon1))
 
-    y0 = int((-8.8064 - lat0) / 0.0036)
-    y1 = int((-8.8064 - lat1) / 0.0036)
+    # Image rows run from north to south
+    y0 = int(grid.shape[0] - 1 - grid.lat_index(lat0))
+    y1 = int(grid.shape[0] - 1 - grid.lat_index(lat1))
 
     return image.transform(
         size=size,
@@ -0,0 +1,138 @@
+#!/g/data/hh5/public/apps/nci_scripts/python-analysis3
+# Copyright 2020 Scott Wales
+# author: Scott Wales <scott.wales@unimelb.edu.au>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy
+import pandas
+import pytest
+import xarray
+
+from .. import cat as catmod
+
+# Small d0198 grids, aligned like the real ones
+nlat, nlon = 40, 50
+lat_t = -27.8 + 0.0198 * (numpy.arange(nlat) - 20)
+lon_t = 133.26 + 0.0198 * (numpy.arange(nlon) - 25)
+
+grids = {
+    "t": (lat_t, lon_t),
+    "u": (lat_t, lon_t + 0.0099),
+    "v": (lat_t + 0.0099, lon_t),
+}
+
+# (stream, variable, subgrid, levels, steps per file, number of files)
+sample_variables = [
+    ("spec", "sfc_temp", "t", None, 2, 3),
+    ("spec", "uwnd10m", "u", None, 2, 3),
+    ("spec", "vwnd10m", "v", None, 2, 3),
+    ("mdl", "air_temp", "t", 5, 1, 3),
+    ("mdl", "pressure", "t", 5, 1, 3),
+    ("fx", "lnd_mask", "t", None, 1, 1),
+    ("fx", "height_rho", "t", 5, 1, 1),
+]
+
+
+def sample_field(stream, var, grid, levels, time):
+    """
+    Deterministic sample values for a variable
+    """
+    lat, lon = grids[grid]
+    t = (time - pandas.Timestamp("20170327T0000")) / pandas.Timedelta("1h")
+
+    field = 280 + (lat[:, None] + 27.8) * 10 + (lon[None, :] - 133.26) * 5 + t
+    dims = ["latitude", "longitude"]
+    coords = {"latitude": lat, "longitude": lon}
+
+    if levels is not None:
+        level = numpy.arange(1, levels + 1)
+        if var == "pressure":
+            field = 100000 * numpy.exp(-level[:, None, None] / 4) + field
+        elif var == "height_rho":
+            field = 1000.0 * level[:, None, None] + field - 280
+        else:
+            field = field - level[:, None, None]
+        dims = ["model_level_number"] + dims
+        coords["model_level_number"] = level
+
+    if stream == "fx" and var == "lnd_mask":
+        field = (field > 281).astype("float32")
+
+    return field.astype("float32"), dims, coords
+
+
+@pytest.fixture
+def sample_root(tmp_path, monkeypatch):
+    """
+    A small fake Aus400 dataset, used in place of the real data
+
+    Returns the dataset root, the library is patched to use it and a
+    temporary cache directory
+    """
+    root = tmp_path / "aus400"
+    start = pandas.Timestamp("20170327T0000")
+
+    rows = []
+    for stream, var, grid, levels, steps, nfiles in sample_variables:
+        ensembles = [0] if stream == "fx" else [0, 1]
+
+        for ens in ensembles:
+            for f in range(nfiles):
+                file_start = start + pandas.Timedelta(hours=f)
+                times = file_start + pandas.Timedelta(minutes=30) * numpy.arange(steps)
+
+                fields = []
+                for t in times:
+                    field, dims, coords = sample_field(stream, var, grid, levels, t)
+                    fields.append(field + ens)
+
+                da = xarray.DataArray(
+                    numpy.stack(fields),
+                    dims=["time"] + dims,
+                    coords={"time": times, **coords},
+                    name=var,
+                )
+
+                path = f"d0198/{stream}/{var}/{ens:03d}/{var}_{file_start:%Y%m%dT%H%M}.nc"
+                (root / path).parent.mkdir(parents=True, exist_ok=True)
+                chunksizes = [1] * (da.ndim - 2) + [20, 25]
+                da.to_dataset().to_netcdf(
+                    root / path, encoding={var: {"chunksizes": chunksizes}}
+                )
+
+                rows.append(
+                    {
+                        "runid": "u-bq574",
+                        "resolution": "d0198",
+                        "ensemble": ens,
+                        "stream": stream,
+                        "variable": var,
+                        "time": file_start,
+                        "path": path,
+                    }
+                )
+
+    pandas.DataFrame(rows).to_csv(root / "catalogue.csv", index=False)
+    pandas.DataFrame(
+        [
+            {"variable": v[1], "stream": v[0], "standard_name": "", "description": ""}
+            for v in sample_variables
+        ]
+    ).to_csv(root / "variables.csv", index=False)
+
+    monkeypatch.setattr(catmod, "root", root)
+    monkeypatch.setattr(catmod, "_catalogue", None)
+    monkeypatch.setenv("AUS400_CACHE", str(tmp_path / "cache"))
+
+    return root
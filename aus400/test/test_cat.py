@@ -1,4 +1,10 @@
 from ..cat import *
+from .. import cat as catmod
+import numpy
+import os
+import pandas
+import pytest
+import xarray
 
 
 def test_load():
@@ -50,3 +56,275 @@ def test_filter():
     )
 
     assert len(cat) == 1
+
+
+def sample_catalogue():
+    times = pandas.date_range("20170326T0000", periods=48, freq="h")
+    rows = []
+    for res in ["d0036", "d0198"]:
+        for stream, var in [("spec", "sfc_temp"), ("mdl", "air_temp")]:
+            for ens in range(3):
+                for t in times:
+                    rows.append(
+                        {
+                            "resolution": res,
+                            "stream": stream,
+                            "variable": var,
+                            "ensemble": ens,
+                            "time": t,
+                            "path": f"{res}/{stream}/{var}/{ens}/{t:%Y%m%dT%H%M}.nc",
+                        }
+                    )
+
+    return pandas.DataFrame(rows).sample(frac=1, random_state=0)
+
+
+def test_filter_index():
+    plain = sample_catalogue()
+    indexed = index_catalogue(plain)
+
+    queries = [
+        {"resolution": "d0036", "stream": "spec"},
+        {"variable": "air_temp", "time": "20170327T0100"},
+        {"time": "20170327"},
+        {"stream": "mdl", "time": "20170327T01"},
+        {"ensemble": slice(1, 2), "time": slice("20170326T0000", "20170326T1200")},
+        {"resolution": "d0198", "path": "d0198/mdl/air_temp/2/20170327T0000.nc"},
+        {"resolution": "d0198", "stream": "fx"},
+        {"time": slice("20170401T0000", "20170402T0000")},
+    ]
+
+    for q in queries:
+        a = filter_catalogue(plain, **q)
+        b = filter_catalogue(indexed, **q)
+
+        assert sorted(a["path"]) == sorted(b["path"])
+
+    # Time strings match exactly, not the whole day
+    assert len(filter_catalogue(indexed, time="20170327")) == 12
+
+
+def test_catalogue_cache(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+
+    data = tmp_path / "data"
+    data.mkdir()
+    monkeypatch.setattr(catmod, "root", data)
+    monkeypatch.setenv("AUS400_CACHE", str(tmp_path / "cache"))
+
+    sample = sample_catalogue()
+    sample.to_csv(data / "catalogue.csv", index=False)
+    pandas.DataFrame(
+        {
+            "variable": ["sfc_temp", "air_temp"],
+            "stream": ["spec", "mdl"],
+            "standard_name": ["surface_temperature", "air_temperature"],
+        }
+    ).to_csv(data / "variables.csv", index=False)
+
+    cat = catmod.load_catalogue()
+    assert len(list((tmp_path / "cache").glob("catalogue-*.parquet"))) == 1
+    assert len(cat) == len(sample)
+    assert cat["variable"].dtype == "category"
+
+    # Second read comes from the cache
+    cached = catmod.load_catalogue()
+    pandas.testing.assert_frame_equal(cat, cached)
+    assert len(filter_catalogue(cached, stream="mdl", time="20170327T0100")) == 6
+
+    # Changing the source invalidates the cache
+    sample.iloc[:10].to_csv(data / "catalogue.csv", index=False)
+    mtime = (data / "catalogue.csv").stat().st_mtime_ns + 10 ** 10
+    os.utime(data / "catalogue.csv", ns=(mtime, mtime))
+    assert len(catmod.load_catalogue()) == 10
+
+    # Each root has its own cache
+    other = tmp_path / "other"
+    other.mkdir()
+    sample.iloc[:5].to_csv(other / "catalogue.csv", index=False)
+    (other / "variables.csv").write_text((data / "variables.csv").read_text())
+    monkeypatch.setattr(catmod, "root", other)
+    assert len(catmod.load_catalogue()) == 5
+    assert len(list((tmp_path / "cache").glob("catalogue-*.parquet"))) == 2
+
+    monkeypatch.setattr(catmod, "root", data)
+    assert len(catmod.load_catalogue()) == 10
+
+
+def test_metadata(sample_root, monkeypatch):
+    assert variable_metadata("d0198", "mdl", "air_temp") is None
+
+    path = build_metadata()
+    assert path == metadata_path()
+
+    meta = variable_metadata("d0198", "mdl", "air_temp")
+    assert meta["dims"] == ("time", "model_level_number", "latitude", "longitude")
+    assert meta["shape"] == (1, 5, 40, 50)
+    assert meta["dtype"] == numpy.float32
+    assert meta["chunksizes"] == (1, 1, 20, 25)
+
+    # Loading shouldn't need to open a sample file
+    def fail(*args, **kwargs):
+        raise AssertionError("Sample file opened")
+
+    monkeypatch.setattr(catmod.xarray, "open_dataset", fail)
+
+    ds = load(stream="mdl", variable="air_temp", ensemble=0, access="timeseries")
+    assert ds["air_temp"].shape == (1, 3, 5, 40, 50)
+    assert ds["air_temp"].chunks[2] == (1,) * 5
+
+
+def test_references(sample_root):
+    pytest.importorskip("kerchunk")
+
+    paths = build_references(variable="air_temp")
+    assert paths == [reference_path("d0198", "mdl", "air_temp")]
+
+    ds = load(variable="air_temp", time=slice("20170327T0100", "20170327T0200"))
+    ds_ref = load(
+        variable="air_temp",
+        time=slice("20170327T0100", "20170327T0200"),
+        references=True,
+    )
+    xarray.testing.assert_allclose(ds["air_temp"], ds_ref["air_temp"])
+
+    # Multiple steps per file, single ensemble member
+    build_references(stream="spec", variable="sfc_temp")
+    ds = load(variable="sfc_temp", ensemble=1, time="20170327T0100")
+    ds_ref = load(variable="sfc_temp", ensemble=1, time="20170327T0100", references=True)
+    assert ds_ref["time"].size == 2
+    xarray.testing.assert_allclose(ds["sfc_temp"], ds_ref["sfc_temp"])
+
+    with pytest.raises(FileNotFoundError):
+        load(variable="pressure", references=True)
+
+
+def test_load_region(sample_root):
+    full = load(stream="mdl", variable="air_temp")["air_temp"]
+
+    region = load(
+        stream="mdl",
+        variable="air_temp",
+        latitude=slice(-27.9, -27.6),
+        longitude=slice(133.0, 133.5),
+    )["air_temp"]
+
+    expected = full.sel(latitude=slice(-27.9, -27.6), longitude=slice(133.0, 133.5))
+    xarray.testing.assert_identical(region, expected)
+
+    # The graph only covers the region
+    assert region.chunks[-2:] == ((expected.latitude.size,), (expected.longitude.size,))
+
+    def tasks(da):
+        from dask.core import flatten
+        from dask.optimization import cull
+
+        keys = list(flatten(da.data.__dask_keys__()))
+        return len(cull(dict(da.data.__dask_graph__()), keys)[0])
+
+    small = {"latitude": 5, "longitude": 5}
+    full = load_var("air_temp", stream="mdl", chunks=small)
+    region = load_var(
+        "air_temp",
+        stream="mdl",
+        chunks=small,
+        latitude=slice(-27.9, -27.6),
+        longitude=slice(133.0, 133.5),
+    )
+    assert region.data.npartitions < full.data.npartitions / 2
+    assert tasks(region) < tasks(full) / 2
+
+    bbox = load_var(
+        "air_temp", stream="mdl", bbox=(133.0, -27.9, 133.5, -27.6), ensemble=1
+    )
+    xarray.testing.assert_identical(bbox, expected.sel(ensemble=[1]))
+
+    with pytest.raises(ValueError):
+        load_var("air_temp", bbox=(133.0, -27.9, 133.5, -27.6), latitude=-27.8)
+
+
+def test_load_all(sample_root):
+    results = load_all(stream="spec", max_workers=4)
+    assert list(results) == [
+        "d0198.spec.sfc_temp",
+        "d0198.spec.uwnd10m",
+        "d0198.spec.vwnd10m",
+    ]
+
+    for name, ds in results.items():
+        var = name.split(".")[-1]
+        expected = load_var(var, stream="spec", max_workers=1)
+        xarray.testing.assert_identical(ds[var], expected)
+
+    # Errors from the pool are passed on
+    path = filter_catalogue(variable="uwnd10m", ensemble=1)["path"].iloc[0]
+    (sample_root / path).unlink()
+    with pytest.raises(OSError):
+        load_all(stream="spec", cache=False)
+
+
+def test_extract_points(sample_root):
+    lats = numpy.array([-27.75, -27.5, -28.1, -27.74])
+    lons = numpy.array([133.0, 133.5, 133.26, 133.01])
+    names = ["a", "b", "c", "d"]
+
+    da = load_var("air_temp", stream="mdl")
+    expected = da.sel(
+        latitude=xarray.DataArray(lats, dims="station"),
+        longitude=xarray.DataArray(lons, dims="station"),
+        method="nearest",
+    ).assign_coords(station=names)
+
+    points = extract_points("air_temp", lats, lons, names=names, stream="mdl")
+    xarray.testing.assert_allclose(points, expected.transpose(*points.dims))
+
+    df = extract_points(
+        "sfc_temp", lats, lons, stream="spec", ensemble=1, as_dataframe=True
+    )
+    assert df.index.names == ["station", "ensemble", "time"]
+    assert len(df) == 4 * 6
+
+    fx = extract_points("lnd_mask", lats, lons)
+    assert fx.dims == ("station",)
+
+
+def test_load_cache(sample_root):
+    clear_cache()
+
+    a = load_var("air_temp", stream="mdl", time=slice("20170327T0000", "20170327T0100"))
+    b = load_var("air_temp", stream="mdl", time=slice("20170326T2000", "20170327T0130"))
+    assert a.data is b.data
+
+    # Callers can't modify the cached copy
+    a.attrs["foo"] = "bar"
+    assert "foo" not in load_var("air_temp", stream="mdl", ensemble=slice(0, 1)).attrs
+
+    c = load_var("air_temp", stream="mdl", time="20170327T0000")
+    assert c.data is not a.data
+
+    mask = load_var("lnd_mask")
+
+    set_cache_size(1)
+    load_var("pressure", stream="mdl")
+    assert load_var("air_temp", stream="mdl").data is not a.data
+
+    # fx variables aren't evicted by other variables
+    assert load_var("lnd_mask").data is mask.data
+
+    clear_cache()
+    assert load_var("lnd_mask").data is not mask.data
+
+    set_cache_size(32)
+
+
+def test_load_cache_array_region(sample_root):
+    clear_cache()
+
+    lat = -27.8 + 0.0198 * numpy.array([0, 5])
+    a = load_var("air_temp", stream="mdl", latitude=lat)
+    assert a.sizes["latitude"] == 2
+
+    # Equal arrays share a cache entry, different ones don't
+    assert load_var("air_temp", stream="mdl", latitude=lat.copy()).data is a.data
+    b = load_var("air_temp", stream="mdl", latitude=lat[:1])
+    assert b.data is not a.data
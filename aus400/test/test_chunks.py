@@ -0,0 +1,75 @@
+#!/g/data/hh5/public/apps/nci_scripts/python-analysis3
+# Copyright 2020 Scott Wales
+# author: Scott Wales <scott.wales@unimelb.edu.au>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from ..chunks import *
+from ..cat import load_var
+import pytest
+
+dims = ("time", "model_level_number", "latitude", "longitude")
+shape = (6, 70, 10554, 13194)
+
+
+def test_plan_chunks():
+    disk = (1, 1, 500, 500)
+
+    c = plan_chunks(dims, shape, "float32", disk, access="map", target_bytes="64MiB")
+    assert c["time"] == 1 and c["model_level_number"] == 1
+    assert c["latitude"] == 4000 and c["longitude"] == 4000
+
+    c = plan_chunks(
+        dims, shape, "float32", disk, access="column", target_bytes="128MiB"
+    )
+    assert c["model_level_number"] == 70
+    assert c["latitude"] == 500 and c["longitude"] == 500
+
+    c = plan_chunks(
+        dims, shape, "float32", disk, access="timeseries", target_bytes="64MiB"
+    )
+    assert c["time"] == 6
+    assert c["latitude"] % 500 == 0 and c["longitude"] % 500 == 0
+
+    c = plan_chunks(
+        dims, shape, "float32", disk, access="section", target_bytes="128MiB"
+    )
+    assert c["model_level_number"] == 70 and c["time"] == 1
+    assert c["latitude"] == 500 and c["longitude"] == 500
+
+    # Chunks cover whole disk chunks, and never exceed the target
+    for access in access_patterns:
+        c = plan_chunks(
+            dims, shape, "float32", disk, access=access, target_bytes="64MiB"
+        )
+        for d, n in zip(dims, disk):
+            assert c[d] % n == 0 or c[d] == shape[dims.index(d)]
+        size = 4
+        for v in c.values():
+            size *= v
+        assert size <= 64 * 2 ** 20
+
+    # Contiguous files
+    c = plan_chunks(dims, shape, "float32", access="map", target_bytes="1MiB")
+    assert c == {"time": 1, "model_level_number": 1, "latitude": 500, "longitude": 500}
+
+    with pytest.raises(ValueError):
+        plan_chunks(dims, shape, "float32", access="random")
+
+
+def test_load_access(sample_root):
+    da = load_var("air_temp", stream="mdl", access="column")
+    assert da.chunks[2] == (5,)
+
+    da = load_var("air_temp", stream="mdl", chunks={"latitude": 10, "longitude": 10})
+    assert da.chunks[-2] == (10,) * 4
@@ -1,5 +1,10 @@
-from ..cat import load
-from ..cross_sec import cross_sec
+from ..cat import load, load_var
+from ..cross_sec import cross_sec, SectionPlan
+from ..cross_sec import polyline_sec, multi_sec, section_like
+from ..cross_sec import deg_to_dist, great_circle
+from ..grids import grids
+import numpy
+import xarray
 
 
 def test_cross_sec():
@@ -35,6 +40,211 @@ def test_cross_sec():
     assert ds_cs.horz_dim.size == 100
 
 
+def _assert_linear(cs):
+    """
+    Check section 'cs' of the sample 'sfc_temp' matches the linear sample
+    field at its points
+    """
+    hours = (cs["time"] - cs["time"][0]) / numpy.timedelta64(1, "h")
+    expect = (
+        280
+        + (cs["latitude"] + 27.8) * 10
+        + (cs["longitude"] - 133.26) * 5
+        + hours
+        + cs["ensemble"]
+    )
+    numpy.testing.assert_allclose(cs.values, expect.transpose(*cs.dims), rtol=1e-6)
+
+
+def test_section_plan(sample_root):
+    da = load_var("sfc_temp", stream="spec")
+
+    plan = SectionPlan(grids["d0198t"], 133.1, -28.0, 133.5, -27.6)
+    cs = plan.apply(da)
+
+    assert cs.dims == ("ensemble", "time", "distance")
+    assert cs.attrs["grid"] == "d0198t"
+    numpy.testing.assert_allclose(cs["distance"], plan.distance)
+
+    # The sample field is linear, so bilinear interpolation is exact
+    _assert_linear(cs)
+
+    # Matches xarray's interpolation, and works on chunked data
+    interp = da.interp(
+        latitude=xarray.DataArray(plan.latitude, dims="distance"),
+        longitude=xarray.DataArray(plan.longitude, dims="distance"),
+    )
+    chunked = plan.apply(da.chunk({"latitude": 7, "longitude": 9}))
+    numpy.testing.assert_allclose(chunked.values, interp.values, rtol=1e-6)
+
+    # cross_sec uses the same points
+    r = cross_sec(da, 133.1, -28.0, 133.5, -27.6)
+    numpy.testing.assert_allclose(r.values, cs.values)
+    numpy.testing.assert_allclose(r.attrs["section"], plan.section)
+
+
+def test_section_chunks(sample_root):
+    from dask.core import flatten
+    from dask.optimization import cull
+
+    da = load_var("air_temp", stream="mdl").load()
+    chunked = da.chunk({"latitude": 5, "longitude": 5})
+
+    cs = cross_sec(chunked, 133.0, -28.1, 133.6, -27.5)
+    numpy.testing.assert_allclose(
+        cs.values, cross_sec(da, 133.0, -28.1, 133.6, -27.5).values
+    )
+
+    # Only the chunks along the diagonal are read, not its bounding box
+    keys = list(flatten(cs.data.__dask_keys__()))
+    graph, _ = cull(dict(cs.data.__dask_graph__()), keys)
+    name = chunked.data.name
+    read = {k[-2:] for k in graph if isinstance(k, tuple) and k[0] == name}
+
+    # Cells gathered by the plan, relative to the start of the sample data
+    grid = grids["d0198t"]
+    plan = SectionPlan(grid, 133.0, -28.1, 133.6, -27.5)
+    iy = plan._plan._iy - int(numpy.rint(grid.lat_index(da["latitude"].values[0])))
+    ix = plan._plan._ix - int(numpy.rint(grid.lon_index(da["longitude"].values[0])))
+    corners = {
+        ((y + dy) // 5, (x + dx) // 5)
+        for y, x in zip(iy, ix)
+        for dy in (0, 1)
+        for dx in (0, 1)
+    }
+    box = (numpy.ptp(iy) // 5 + 2) * (numpy.ptp(ix) // 5 + 2)
+
+    assert read <= corners
+    assert len(read) < box / 2
+
+    # Loading for sections keeps horizontal chunks small
+    da = load_var("air_temp", stream="mdl", access="section")
+    assert da.chunks[2] == (5,)
+
+
+def _blocks_read(result, source):
+    """
+    Chunks of dask array 'source' that 'result' depends on
+    """
+    from dask.core import flatten
+    from dask.optimization import cull
+
+    keys = list(flatten(result.data.__dask_keys__()))
+    graph, _ = cull(dict(result.data.__dask_graph__()), keys)
+
+    return {k for k in graph if isinstance(k, tuple) and k[0] == source.data.name}
+
+
+def test_multi_sec(sample_root):
+    da = load_var("sfc_temp", stream="spec").load()
+    lat = da["latitude"].values
+    lon = da["longitude"].values
+
+    # Vertices on grid points, so segments share their end points
+    xs, ys = lon[[15, 25, 33]], lat[[10, 20, 15]]
+
+    pl = polyline_sec(da, xs, ys)
+    a = cross_sec(da, xs[0], ys[0], xs[1], ys[1])
+    b = cross_sec(da, xs[1], ys[1], xs[2], ys[2])
+
+    assert pl.sizes["distance"] == a.sizes["distance"] + b.sizes["distance"] - 1
+    numpy.testing.assert_allclose(
+        pl.values, numpy.concatenate([a.values, b.values[..., 1:]], axis=-1)
+    )
+    assert (numpy.diff(pl["distance"]) > 0).all()
+    numpy.testing.assert_allclose(section_like(da, pl).values, pl.values)
+
+    # Off-grid vertices, the distance follows the whole path
+    track = polyline_sec(da, [133.01, 133.23, 133.49], [-27.91, -27.63, -27.97])
+    step = numpy.diff(track["distance"].values)
+    assert (step > 0).all()
+    numpy.testing.assert_allclose(
+        track["distance"].values,
+        deg_to_dist(track["longitude"].values, track["latitude"].values),
+    )
+    _assert_linear(track)
+
+    sections = [
+        (133.0, -28.0, 133.4, -27.7),
+        list(zip(xs, ys)),
+        (132.9, -27.8, 133.6, -27.8),
+    ]
+    singles = [
+        cross_sec(da, *sections[0]),
+        pl,
+        cross_sec(da, *sections[2]),
+    ]
+
+    stacked = multi_sec(da, sections)
+    assert stacked.dims == ("ensemble", "time", "section", "point")
+    assert stacked.sizes["point"] == max(s.sizes["distance"] for s in singles)
+
+    for i, single in enumerate(singles):
+        n = single.sizes["distance"]
+        row = stacked.isel(section=i)
+        numpy.testing.assert_allclose(row.isel(point=slice(0, n)).values, single.values)
+        assert row.isel(point=slice(n, None)).isnull().all()
+
+    joined = multi_sec(da, sections, stack=False)
+    assert joined.sizes["distance"] == sum(s.sizes["distance"] for s in singles)
+    numpy.testing.assert_array_equal(
+        numpy.unique(joined["section"], return_counts=True)[1],
+        [s.sizes["distance"] for s in singles],
+    )
+
+    # The sections are read together, each chunk once
+    chunked = da.chunk({"latitude": 5, "longitude": 5})
+    read = _blocks_read(multi_sec(chunked, sections), chunked)
+    union = set()
+    for s in sections:
+        union |= _blocks_read(multi_sec(chunked, [s]), chunked)
+    assert read == union
+
+
+def test_deg_to_dist():
+    # One degree of a great circle
+    deg = 6371 * numpy.pi / 180
+
+    numpy.testing.assert_allclose(deg_to_dist([0, 1, 3], 0), [0, deg, 3 * deg])
+    numpy.testing.assert_allclose(deg_to_dist(133, [-30, -29.5]), [0, deg / 2])
+
+    # Distances along a great circle add up
+    lons, lats = great_circle(110, -40, 150, -10, spacing=25)
+    total = deg_to_dist([110, 150], [-40, -10])[-1]
+    numpy.testing.assert_allclose(deg_to_dist(lons, lats)[-1], total)
+
+
+def test_great_circle():
+    lons, lats = great_circle(120, -30, 150, -30, spacing=10)
+
+    numpy.testing.assert_allclose([lons[0], lats[0]], [120, -30])
+    numpy.testing.assert_allclose([lons[-1], lats[-1]], [150, -30])
+
+    # Evenly spaced, no more than 'spacing' apart
+    step = numpy.diff(deg_to_dist(lons, lats))
+    numpy.testing.assert_allclose(step, step[0])
+    assert step[0] <= 10
+
+    # Great circles bow towards the pole
+    assert lats[lats.size // 2] < -30.5
+
+
+def test_cross_sec_great_circle(sample_root):
+    da = load_var("sfc_temp", stream="spec")
+
+    cs = cross_sec(da, 133.0, -28.0, 133.6, -27.6, spacing=5)
+    assert cs.attrs["section_spacing"] == 5
+
+    distance = cs["distance"].values
+    numpy.testing.assert_allclose(distance[-1], numpy.ptp(distance))
+    assert (numpy.diff(distance) <= 5).all()
+
+    # The sample field is linear, so bilinear interpolation is exact
+    _assert_linear(cs)
+
+    numpy.testing.assert_allclose(section_like(da, cs).values, cs.values)
+
+
 if __name__ == "__main__":
     test_cross_sec()
     print("passed all tests")
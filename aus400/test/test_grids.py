@@ -0,0 +1,107 @@
+#!/g/data/hh5/public/apps/nci_scripts/python-analysis3
+# Copyright 2020 Scott Wales
+# author: Scott Wales <scott.wales@unimelb.edu.au>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from ..grids import *
+from ..cat import load_var
+import dataclasses
+import numpy
+import pytest
+
+
+def test_registry():
+    t = grids["d0036t"]
+    assert t.shape == (10554, 13194)
+    assert t.latitude[-1] == pytest.approx(-8.8064)
+    assert t.longitude[0] == pytest.approx(109.5106)
+
+    assert grids["d0036u"].lon0 == pytest.approx(t.lon0 + 0.0018)
+    assert grids["d0036v"].lat0 == pytest.approx(t.lat0 + 0.0018)
+
+    # Corners of the t grids
+    for name, shape, (south, north), (west, east) in [
+        ("d0036t", (10554, 13194), (-46.7972, -8.8064), (109.5106, 157.0054)),
+        ("d0198t", (2120, 2600), (-48.788, -6.8318), (107.52, 158.98)),
+    ]:
+        g = grids[name]
+        assert g.shape == shape
+        assert g.latitude[[0, -1]] == pytest.approx([south, north])
+        assert g.longitude[[0, -1]] == pytest.approx([west, east])
+
+    # The test data is centred on a d0198t point
+    d = grids["d0198t"]
+    assert d.lat_index(-27.8) == pytest.approx(1060)
+    assert d.lon_index(133.26) == pytest.approx(1300)
+    assert abs(t.lat_index(-27.8) - round(t.lat_index(-27.8))) < 1e-6
+
+    # Points in the south-west of the d0198 domain, outside of d0036
+    iy, ix = d.index(-47.5, 108.5)
+    assert abs(d.latitude[iy] + 47.5) <= d.spacing / 2
+    assert abs(d.longitude[ix] - 108.5) <= d.spacing / 2
+
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        t.spacing = 1
+
+    iy, ix = t.index([-27.8, -100], [133.26, 200])
+    assert t.latitude[iy] == pytest.approx([-27.8, t.lat0])
+    assert ix[1] == t.shape[1] - 1
+
+
+def test_identify(sample_root):
+    expect = {"sfc_temp": "d0198t", "uwnd10m": "d0198u", "vwnd10m": "d0198v"}
+
+    for var, grid in expect.items():
+        da = load_var(var, stream="spec")
+        assert da.attrs["grid"] == grid
+
+        # From the coordinates
+        da.attrs = {}
+        assert identify(da).name == grid
+        assert identify(da.isel(latitude=slice(5, 10), longitude=3)).name == grid
+
+    # A stale 'grid' attribute is ignored
+    u = load_var("uwnd10m", stream="spec")
+    t = load_var("sfc_temp", stream="spec")
+    moved = u.interp(longitude=t["longitude"].values[1:-1])
+    assert moved.attrs["grid"] == "d0198u"
+    assert identify(moved).name == "d0198t"
+
+    coarse = t.coarsen(latitude=2, longitude=2, boundary="trim").mean()
+    coarse.attrs = t.attrs
+    with pytest.raises(ValueError):
+        identify(coarse)
+
+
+def test_sel(sample_root):
+    da = load_var("sfc_temp", stream="spec")
+    grid = identify(da)
+
+    sub = da.isel(latitude=slice(5, 30), longitude=slice(10, 40))
+    lat = sub["latitude"].values
+    lon = sub["longitude"].values
+
+    # Slices with bounds between and on grid points
+    for s in [slice(lat[2] - 0.001, lat[10] + 0.001), slice(lat[2], lat[10])]:
+        numpy.testing.assert_array_equal(
+            grid.sel(sub, latitude=s)["latitude"], sub.sel(latitude=s)["latitude"]
+        )
+
+    r = grid.sel(sub, latitude=lat[4] + 0.003, longitude=[lon[0] - 1, lon[7] - 0.004])
+    assert r["latitude"] == lat[4]
+    numpy.testing.assert_array_equal(r["longitude"], [lon[0], lon[7]])
+
+    lat, lon = grid.region((-27.81, -27.7), (133.3, 133.4))
+    assert lat[0] >= -27.81 and lat[-1] <= -27.7
+    numpy.testing.assert_allclose(numpy.diff(lon), grid.spacing)
@@ -16,6 +16,9 @@
 
 from ..regrid import *
 from ..cat import load
+import numpy
+import pytest
+import xarray
 
 
 def test_id_grid():
@@ -62,3 +65,303 @@ def test_id_grid():
 
     assert identify_grid(ds) == "d0198v"
     assert identify_grid(ds["vwnd10m"]) == "d0198v"
+
+
+def write_esmf_weights(path, source, target, row, col, S):
+    """
+    Write weights from grid 'source' to grid 'target' in ESMF format
+    """
+    (slat, slon), (tlat, tlon) = source, target
+    xc_b, yc_b = numpy.meshgrid(tlon, tlat)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    xarray.Dataset(
+        {
+            "S": ("n_s", S),
+            "row": ("n_s", row + 1),
+            "col": ("n_s", col + 1),
+            "src_grid_dims": ("src_grid_rank", [slon.size, slat.size]),
+            "dst_grid_dims": ("dst_grid_rank", [tlon.size, tlat.size]),
+            "xc_a": ("n_a", numpy.zeros(slat.size * slon.size)),
+            "xc_b": ("n_b", xc_b.ravel()),
+            "yc_b": ("n_b", yc_b.ravel()),
+        }
+    ).to_netcdf(path)
+
+
+def test_to_d0198_weights(sample_root):
+    from .conftest import grids
+
+    # Average neighbouring u points onto the t grid, the first column has no
+    # source points
+    lat, lon = grids["t"]
+    i, j = numpy.meshgrid(
+        numpy.arange(lat.size), numpy.arange(1, lon.size), indexing="ij"
+    )
+    target = (i * lon.size + j).ravel()
+    row = numpy.concatenate([target, target])
+    col = numpy.concatenate([target - 1, target])
+    write_esmf_weights(
+        sample_root / "grids" / "weights_d0198u_to_d0198t.nc",
+        grids["u"],
+        grids["t"],
+        row,
+        col,
+        numpy.full(row.size, 0.5),
+    )
+    clear_weights_cache()
+
+    u = load(resolution="d0198", stream="spec", variable="uwnd10m", ensemble=0)
+    r = apply_weights(u, regrid_weights("d0198u", "d0198t"))
+
+    numpy.testing.assert_array_equal(r["latitude"], lat)
+    numpy.testing.assert_array_equal(r["longitude"], lon)
+    assert r["uwnd10m"].dims == u["uwnd10m"].dims
+
+    expect = (u["uwnd10m"].values[..., 1:] + u["uwnd10m"].values[..., :-1]) / 2
+    numpy.testing.assert_allclose(r["uwnd10m"].values[..., 1:], expect, rtol=1e-6)
+    assert numpy.isnan(r["uwnd10m"].values[..., 0]).all()
+
+    # Numpy data gives the same result
+    weights = regrid_weights("d0198u", "d0198t")
+    numpy.testing.assert_allclose(
+        apply_weights(u.load(), weights)["uwnd10m"], r["uwnd10m"]
+    )
+
+    # Weights are only read once
+    (sample_root / "grids" / "weights_d0198u_to_d0198t.nc").unlink()
+    assert regrid_weights("d0198u", "d0198t") is weights
+
+
+def test_to_d0198_separable(sample_root):
+    from .conftest import grids
+
+    # No weights file is needed
+    lat, lon = grids["t"]
+    u = load(resolution="d0198", stream="spec", variable="uwnd10m", ensemble=0)
+    r = to_d0198(u)
+
+    numpy.testing.assert_allclose(r["latitude"], lat)
+    numpy.testing.assert_allclose(r["longitude"], lon[1:])
+
+    expect = (u["uwnd10m"].values[..., 1:] + u["uwnd10m"].values[..., :-1]) / 2
+    numpy.testing.assert_allclose(r["uwnd10m"].values, expect, rtol=1e-6)
+
+    # Same as the full weights
+    weights = bilinear_weights(u["latitude"], u["longitude"], lat, lon[1:])
+    full = RegridWeights(weights.matrix, weights.source_shape, lat, lon[1:])
+    numpy.testing.assert_allclose(
+        apply_weights(u, full)["uwnd10m"], r["uwnd10m"], rtol=1e-6
+    )
+    assert bilinear_weights(u["latitude"], u["longitude"], lat, lon[1:]) is weights
+
+    # Arbitrary resolutions and regions, points outside the source are NaN
+    r = to_resolution(u.sel(latitude=slice(-27.9, -27.5)), 0.05)
+    assert numpy.allclose(numpy.diff(r["longitude"]), 0.05)
+    assert r["latitude"].min() >= -27.9
+
+    lat2 = numpy.array([lat[0] - 1, lat[3]])
+    r = to_grid(u["uwnd10m"], lat2, lon[1:3])
+    assert numpy.isnan(r.values[..., 0, :]).all()
+    numpy.testing.assert_allclose(r.values[..., 1, :], expect[..., 3, 0:2], rtol=1e-6)
+
+
+def test_apply_weights_batched():
+    rng = numpy.random.default_rng(0)
+    matrix = rng.random((12, 20)) * (rng.random((12, 20)) > 0.7)
+    matrix[0] = 0
+    weights = RegridWeights(matrix, (4, 5), numpy.arange(3), numpy.arange(4))
+
+    da = xarray.DataArray(
+        rng.random((3, 6, 4, 5)).astype("float32"),
+        dims=["time", "model_level_number", "latitude", "longitude"],
+    )
+
+    # Regridding all slices together matches regridding each on its own
+    expect = numpy.stack(
+        [
+            [(matrix @ s.ravel()).reshape(3, 4) for s in level]
+            for level in da.values
+        ]
+    )
+    expect[..., 0, 0] = numpy.nan
+
+    r = apply_weights(da.chunk({"time": 1, "latitude": 2}), weights)
+    assert r.dims == da.dims
+    assert r.dtype == da.dtype
+    numpy.testing.assert_allclose(r.values, expect, rtol=1e-6)
+
+    # Horizontal dimensions are moved last
+    r = apply_weights(da.transpose("latitude", "time", "longitude", ...), weights)
+    numpy.testing.assert_allclose(r.values, expect, rtol=1e-6)
+
+
+def test_regrid_vector(sample_root):
+    from ..cross_sec import cross_sec
+    from .conftest import grids
+
+    lat, lon = grids["t"]
+
+    u = load(resolution="d0198", stream="spec", variable="uwnd10m")["uwnd10m"]
+    r = regrid_vector(u)
+
+    assert r.dims == u.dims
+    assert identify_grid(r) == "d0198t"
+    numpy.testing.assert_allclose(r["longitude"], lon[1:])
+    expect = (u.values[..., 1:] + u.values[..., :-1]) / 2
+    numpy.testing.assert_allclose(r.values, expect, rtol=1e-6)
+
+    # Chunk boundaries along the staggered dimension
+    r = regrid_vector(u.chunk({"longitude": 7}))
+    assert r.chunks[-1][0] == 7
+    numpy.testing.assert_allclose(r.values, expect, rtol=1e-6)
+
+    v = load(resolution="d0198", stream="spec", variable="vwnd10m")["vwnd10m"]
+    r = regrid_vector(v.isel(time=[0]).chunk({"latitude": 3}))
+    assert r.sizes["time"] == 1
+    numpy.testing.assert_allclose(r["latitude"], lat[1:])
+    expect = (v.values[:, :1, 1:, :] + v.values[:, :1, :-1, :]) / 2
+    numpy.testing.assert_allclose(r.values, expect, rtol=1e-6)
+
+    # Zonal cross-section of u
+    cs = cross_sec(u, lon[2] + 0.0099, lat[5], lon[10] + 0.0099, lat[5])
+    r = regrid_vector(cs)
+    assert r.sizes["distance"] == cs.sizes["distance"] - 1
+    numpy.testing.assert_allclose(r["longitude"], lon[3:11])
+
+    # Diagonal cross-sections of u can't be destaggered along the section
+    cs = cross_sec(u, lon[2] + 0.0099, lat[5], lon[10] + 0.0099, lat[9])
+    with pytest.raises(Exception):
+        regrid_vector(cs)
+
+
+def test_conservative():
+    rng = numpy.random.default_rng(0)
+
+    # 5.5 source cells per target cell, with the same outer edges
+    src_lat = -28 + 0.0036 * (numpy.arange(22) + 0.5)
+    src_lon = 133 + 0.0036 * (numpy.arange(11) + 0.5)
+    tgt_lat = -28 + 0.0198 * (numpy.arange(4) + 0.5)
+    tgt_lon = 133 + 0.0198 * (numpy.arange(2) + 0.5)
+
+    da = xarray.DataArray(
+        rng.random((3, 22, 11)),
+        dims=["time", "latitude", "longitude"],
+        coords={"latitude": src_lat, "longitude": src_lon},
+    )
+
+    def area(lat, lon, spacing):
+        s = numpy.sin(numpy.radians(lat + spacing / 2))
+        s -= numpy.sin(numpy.radians(lat - spacing / 2))
+        return s[:, None] * numpy.full(lon.size, spacing)[None, :]
+
+    r = to_grid(da, tgt_lat, tgt_lon, method="conservative")
+
+    # Area integrals are kept
+    numpy.testing.assert_allclose(
+        (r * area(tgt_lat, tgt_lon, 0.0198)).sum(["latitude", "longitude"]),
+        (da * area(src_lat, src_lon, 0.0036)).sum(["latitude", "longitude"]),
+    )
+
+    # Chunked input gives the same result
+    c = da.chunk({"latitude": 5, "longitude": 4})
+    c = to_grid(c, tgt_lat, tgt_lon, method="conservative")
+    numpy.testing.assert_allclose(c.values, r.values)
+
+    # Constant fields are unchanged, missing values are left out
+    da[:] = 1
+    da[:, 0, 0] = numpy.nan
+    r = to_grid(da, tgt_lat, tgt_lon, method="conservative")
+    numpy.testing.assert_allclose(r.values, 1)
+
+    # Partly covered cells are the mean of the covered part
+    r = to_grid(da, tgt_lat - 0.01, tgt_lon, method="conservative")
+    numpy.testing.assert_allclose(r.values, 1)
+
+    # Weights are cached until cleared
+    from ..regrid import _conservative_weights
+
+    assert _conservative_weights.cache_info().currsize > 0
+    clear_weights_cache()
+    assert _conservative_weights.cache_info().currsize == 0
+
+
+def test_to_points(sample_root):
+    import pickle
+    from .conftest import grids as sample_grids
+
+    lat, lon = sample_grids["t"]
+    da = load(resolution="d0198", stream="spec", variable="sfc_temp")["sfc_temp"]
+
+    rng = numpy.random.default_rng(0)
+    plat = rng.uniform(lat[0], lat[-1], 100)
+    plon = rng.uniform(lon[0], lon[-1], 100)
+    # Points on the edges of the data
+    plat[:2], plon[:2] = lat[-1], [lon[0], lon[-1]]
+
+    # The sample field is linear in latitude and longitude
+    def expect(field, y, x):
+        origin = field.isel(latitude=0, longitude=0)
+        return origin + (y - lat[0]) * 10 + (x - lon[0]) * 5
+
+    plan = RegridPlan(grids.grids["d0198t"], plat, plon)
+    plan = pickle.loads(pickle.dumps(plan))
+
+    r = plan.apply(da)
+    assert r.dims == ("ensemble", "time", "point")
+    numpy.testing.assert_allclose(
+        r.values, expect(da, r["latitude"], r["longitude"]).values, rtol=1e-5
+    )
+
+    # Regions of the grid, with points outside set to NaN
+    sub = da.isel(latitude=slice(10, 20), longitude=slice(5, 30)).load()
+    r = plan.apply(sub)
+    inside = (
+        (plat >= lat[10]) & (plat <= lat[19]) & (plon >= lon[5]) & (plon <= lon[29])
+    )
+    assert numpy.isnan(r.values[..., ~inside]).all()
+    r_expect = expect(da, r["latitude"], r["longitude"]).values
+    numpy.testing.assert_allclose(r.values[..., inside], r_expect[..., inside], rtol=1e-5)
+
+    # Multi-dimensional points
+    r = to_points(da, plat.reshape(10, 10), plon.reshape(10, 10), dims=["y", "x"])
+    assert r.dims == ("ensemble", "time", "y", "x")
+    assert r["latitude"].dims == ("y", "x")
+
+    with pytest.raises(ValueError):
+        plan.apply(load(resolution="d0198", stream="spec", variable="uwnd10m"))
+
+
+def test_regrid_all(sample_root, tmp_path):
+    from ..cat import load_all
+    from ..regrid import _bilinear_weights
+
+    results = load_all(time=slice("20170327T0000", "20170327T0100"), ensemble=0)
+    assert len(results) == 7
+
+    latitude = numpy.arange(-28, -27.5, 0.05)
+    longitude = numpy.arange(133, 133.6, 0.05)
+
+    clear_weights_cache()
+    out = regrid_all(results, (latitude, longitude))
+
+    # One set of weights for each of the t, u and v grids
+    assert _bilinear_weights.cache_info().misses == 3
+
+    assert out.keys() == results.keys()
+    for name, ds in out.items():
+        var = name.split(".")[-1]
+        numpy.testing.assert_allclose(
+            ds[var], to_grid(results[name], latitude, longitude)[var]
+        )
+
+    # Unchanged if already on the target grid
+    name = "d0198.spec.sfc_temp"
+    assert regrid_all(results, "d0198t")[name] is results[name]
+
+    pytest.importorskip("zarr")
+    regrid_all(results, (latitude, longitude), store=tmp_path / "out.zarr")
+    ds = xarray.open_zarr(tmp_path / "out.zarr", group="d0198.mdl.air_temp")
+    numpy.testing.assert_allclose(
+        ds["air_temp"], out["d0198.mdl.air_temp"]["air_temp"]
+    )
@@ -15,7 +15,9 @@
 # limitations under the License.
 
 from ..vertical import *
+from ..vertical import interp_columns, _whole_columns
 from ..cat import load
+import pytest
 import numpy
 
 
@@ -32,3 +34,234 @@ def test_to_plev():
 
     assert "pressure" in ds_p.dims
     assert ds_p["pressure"].size == 1
+
+
+def test_interp_columns():
+    from ..vertical import _numpy_kernel, _numba_kernel
+
+    rng = numpy.random.default_rng(0)
+    source = numpy.cumsum(rng.random((4, 6, 10)), axis=-1) + 1
+    data = rng.random((4, 6, 10))
+    target = numpy.array([0.5, 2.0, 3.5, 5.0, 100])
+
+    expect = numpy.empty((4, 6, target.size))
+    for idx in numpy.ndindex(4, 6):
+        expect[idx] = numpy.interp(
+            target, source[idx], data[idx], left=numpy.nan, right=numpy.nan
+        )
+
+    kernels = [_numpy_kernel]
+    if _numba_kernel() is not None:
+        kernels.append(_numba_kernel())
+
+    for kernel in kernels:
+        numpy.testing.assert_allclose(kernel(data, source, target), expect)
+
+        # Decreasing columns, like pressure
+        numpy.testing.assert_allclose(
+            kernel(data[..., ::-1], source[..., ::-1], target), expect
+        )
+
+    # Plans are broadcast over extra leading dimensions of the data
+    from ..vertical import _bracket, _gather
+
+    index, weight = _bracket(source, target)
+    stacked = numpy.stack([data, data + 1])
+    r = _gather(stacked, index, weight)
+    numpy.testing.assert_allclose(r, numpy.stack([expect, expect + 1]))
+
+    r = interp_columns(data, source, target, log=True)
+    numpy.testing.assert_allclose(
+        r[0, 0, 1:3],
+        numpy.interp(numpy.log(target[1:3]), numpy.log(source[0, 0]), data[0, 0]),
+    )
+
+
+def test_to_plev_sample(sample_root):
+    from ..cat import load_var
+
+    da = load_var("air_temp", stream="mdl")
+    p = load_var("pressure", stream="mdl")
+    levels = numpy.array([60000, 70000])
+
+    r = to_plev(da.chunk({"latitude": 10}), levels)
+    dims = ["pressure" if d == "model_level_number" else d for d in da.dims]
+    assert r.dims == tuple(dims)
+    numpy.testing.assert_array_equal(r["pressure"], levels)
+
+    column = dict(ensemble=1, time=1, latitude=3, longitude=4)
+    pc = p.isel(column).values
+    expect = numpy.interp(levels, pc[::-1], da.isel(column).values[::-1])
+    numpy.testing.assert_allclose(r.isel(column).values, expect, rtol=1e-5)
+
+    # Whole columns don't make chunks larger than Dask's target size
+    import dask
+
+    with dask.config.set({"array.chunk-size": "8KiB"}):
+        r = to_plev(da.chunk({"model_level_number": 1}), levels)
+        chunked = _whole_columns(da.chunk({"model_level_number": 1}))
+
+    assert chunked.chunks[2] == (da.sizes["model_level_number"],)
+    assert chunked.data.chunksize[-2] < da.sizes["latitude"]
+    assert chunked.data.nbytes / chunked.data.npartitions <= 8192
+    numpy.testing.assert_allclose(r.isel(column).values, expect, rtol=1e-5)
+
+
+def test_height_plan(sample_root, monkeypatch):
+    from ..cat import load_var, cache_dir
+    from ..vertical import clear_plan_cache
+
+    clear_plan_cache()
+
+    da = load_var("air_temp", stream="mdl")
+    height = load_var("height_rho", stream="fx")
+    levels = [1500, 2500, 10000]
+
+    expect = vertical_interp(da, height, levels)
+
+    # The plan has no ensemble or time dimensions, the data does
+    assert {"ensemble", "time"} <= set(da.dims)
+    numpy.testing.assert_allclose(to_height(da, levels).values, expect.values, rtol=1e-6)
+
+    r = to_height(da.chunk({"latitude": 10}), levels)
+    assert r.dims == expect.dims
+    assert r.name == "air_temp"
+    numpy.testing.assert_allclose(r.values, expect.values, rtol=1e-6)
+    assert numpy.isnan(r.sel(height_rho=10000)).all()
+
+    # Plans are reused across calls and variables
+    plan = height_plan(da, levels)
+    assert height_plan(da, levels) is plan
+
+    # Plans bigger than a Dask chunk aren't loaded into memory
+    import dask
+
+    persisted = []
+    monkeypatch.setattr(
+        VerticalPlan, "persist", lambda self: persisted.append(self) or self
+    )
+
+    clear_plan_cache()
+    height_plan(da, levels)
+    assert len(persisted) == 1
+
+    clear_plan_cache()
+    with dask.config.set({"array.chunk-size": "1KiB"}):
+        lazy = height_plan(da, levels)
+    assert len(persisted) == 1
+    numpy.testing.assert_allclose(lazy.apply(da).values, expect.values, rtol=1e-6)
+
+    p = load_var("pressure", stream="mdl")
+    numpy.testing.assert_allclose(
+        plan.apply(p).values, vertical_interp(p, height, levels).values, rtol=1e-6
+    )
+
+    # And to part of their columns
+    part = da.isel(latitude=slice(5, 15), longitude=slice(20, 30))
+    numpy.testing.assert_allclose(
+        plan.apply(part).values,
+        expect.isel(latitude=slice(5, 15), longitude=slice(20, 30)).values,
+        rtol=1e-6,
+    )
+
+    # Plans saved to disk are read back by a new session
+    clear_plan_cache()
+    height_plan(da, levels, cache=True)
+    assert len(list((cache_dir() / "vertical").glob("*.nc"))) == 1
+
+    clear_plan_cache()
+    cached = height_plan(da, levels, cache=True)
+    numpy.testing.assert_array_equal(cached.target, levels)
+    numpy.testing.assert_allclose(cached.apply(da).values, expect.values, rtol=1e-6)
+
+
+def test_to_plev_section(sample_root, monkeypatch):
+    from .. import vertical
+    from ..cat import load_var
+    from ..cross_sec import cross_sec
+
+    da = load_var("air_temp", stream="mdl")
+    p = load_var("pressure", stream="mdl")
+    levels = numpy.array([60000, 70000])
+
+    # Record the size of the pressure fields read
+    loaded = []
+
+    def record(*args, **kwargs):
+        r = load_var(*args, **kwargs)
+        loaded.append(r.sizes)
+        return r
+
+    monkeypatch.setattr(vertical, "load_var", record)
+
+    for section in [(133.0, -27.8, 133.5, -27.8), (133.1, -28.0, 133.5, -27.6)]:
+        cs = cross_sec(da, *section)
+        assert "section" in cs.attrs
+
+        expect = vertical_interp(cs, cross_sec(p, *section), levels)
+        r = to_plev(cs, levels)
+        numpy.testing.assert_allclose(r.values, expect.values, rtol=1e-6)
+
+    # Zonal sections read only the neighbouring rows
+    assert loaded[0]["latitude"] <= 3
+    assert loaded[1]["latitude"] < p.sizes["latitude"]
+
+
+def test_write_levels(sample_root, tmp_path, monkeypatch):
+    import xarray
+    from .. import vertical
+    from ..cat import load_var
+
+    levels = numpy.array([60000, 70000])
+    expect = to_plev(load_var("air_temp", stream="mdl"), levels)
+
+    out = write_levels(tmp_path / "plev", "air_temp", levels, window=2)
+    files = sorted(out.glob("*.nc"))
+    assert len(files) == 2
+
+    with xarray.open_mfdataset(files) as ds:
+        numpy.testing.assert_allclose(ds["air_temp"].values, expect.values, rtol=1e-6)
+
+    # Only missing windows are written again
+    loaded = []
+
+    def record(*args, **kwargs):
+        loaded.append(args[0] if args else kwargs["variable"])
+        return load_var(*args, **kwargs)
+
+    monkeypatch.setattr(vertical, "load_var", record)
+
+    files[-1].unlink()
+    write_levels(tmp_path / "plev", "air_temp", levels, window=2)
+    assert loaded.count("air_temp") == 1
+    assert files[-1].exists()
+
+    # Height levels go through to_height
+    hlevels = [1500, 2500]
+    out = write_levels(tmp_path / "hlev", "air_temp", hlevels, coordinate="height")
+    with xarray.open_mfdataset(sorted(out.glob("*.nc"))) as ds:
+        numpy.testing.assert_allclose(
+            ds["air_temp"].values,
+            to_height(load_var("air_temp", stream="mdl"), hlevels).values,
+            rtol=1e-6,
+        )
+
+    pytest.importorskip("zarr")
+    loaded.clear()
+
+    out = write_levels(tmp_path / "plev.zarr", "air_temp", levels, window=2)
+    with xarray.open_zarr(out) as ds:
+        numpy.testing.assert_allclose(ds["air_temp"].values, expect.values, rtol=1e-6)
+
+    assert loaded.count("air_temp") == 2
+    write_levels(tmp_path / "plev.zarr", "air_temp", levels, window=2)
+    with xarray.open_zarr(out) as ds:
+        assert ds.sizes["time"] == expect.sizes["time"]
+    assert loaded.count("air_temp") == 2
+
+    # One file per window, times must survive being appended
+    out = write_levels(tmp_path / "step.zarr", "air_temp", levels)
+    write_levels(tmp_path / "step.zarr", "air_temp", levels)
+    with xarray.open_zarr(out) as ds:
+        numpy.testing.assert_array_equal(ds["time"].values, expect["time"].values)
+        numpy.testing.assert_allclose(ds["air_temp"].values, expect.values, rtol=1e-6)
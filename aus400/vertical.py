@@ -14,20 +14,219 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from .cat import load_var
-from . import xgcm
-from .regrid import identify_resolution, identify_subgrid
+"""
+Vertical interpolation of Aus400 model level data
+
+Model level data is interpolated column by column, to target values of
+another model level variable like pressure or height. The interpolation
+kernel is compiled with numba if it is installed, otherwise a vectorised numpy
+version is used.
+
+Static level variables like 'height_rho' don't change with time, so the
+levels either side of each target and the interpolation weights only need to
+be found once. These are held in a :class:`VerticalPlan`, which can be
+applied to any variable and time on the same columns, and saved to disk.
+
+Long runs can be converted to pressure or height levels with
+:func:`write_levels`, which works through the files a few at a time so memory
+use doesn't grow with the length of the run.
+"""
+
+import collections
+import functools
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+from .cat import load_var, cache_dir, filter_catalogue
+from .chunks import horizontal_dims
+from . import grids
+import dask
+import numpy
 import xarray
 import pandas
-from .cross_sec import cross_sec
+from dask.utils import parse_bytes
+from .cross_sec import cross_sec, section_bbox, section_like
+
+
+@functools.lru_cache()
+def _numba_kernel():
+    """
+    Column interpolation compiled with numba, or None if numba isn't available
+    """
+    try:
+        import numba
+    except ImportError:
+        return None
+
+    @numba.guvectorize(
+        [
+            "void(float32[:], float32[:], float64[:], float32[:])",
+            "void(float64[:], float64[:], float64[:], float64[:])",
+        ],
+        "(n),(n),(m)->(m)",
+        nopython=True,
+    )
+    def kernel(data, source, target, out):
+        n = source.shape[0]
+        increasing = source[n - 1] > source[0]
+
+        for j in range(target.shape[0]):
+            t = target[j]
+            out[j] = numpy.nan
+
+            if increasing and (t < source[0] or t > source[n - 1]):
+                continue
+            if not increasing and (t > source[0] or t < source[n - 1]):
+                continue
+
+            # Binary search for the levels either side of t
+            lo = 0
+            hi = n - 1
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                if (source[mid] <= t) == increasing:
+                    lo = mid
+                else:
+                    hi = mid
+
+            w = (t - source[lo]) / (source[hi] - source[lo])
+            out[j] = data[lo] + w * (data[hi] - data[lo])
+
+    return kernel
+
+
+def _bracket(source, target):
+    """
+    Lower bracketing level and interpolation weight of each target, over the
+    last axis of 'source'
+
+    Weights are NaN where the target is outside of the column
+    """
+    n = source.shape[-1]
+    index = numpy.empty(source.shape[:-1] + target.shape, dtype="int16")
+    weight = numpy.empty(
+        source.shape[:-1] + target.shape,
+        dtype=numpy.result_type(source.dtype, numpy.float32),
+    )
+
+    increasing = source[..., -1:] > source[..., :1]
+
+    # One target level at a time, so memory use doesn't grow with the number
+    # of targets
+    for j, t in enumerate(target):
+        below = numpy.where(increasing, source <= t, source >= t)
+        k = numpy.clip(below.sum(axis=-1) - 1, 0, n - 2)[..., None]
+
+        s0 = numpy.take_along_axis(source, k, axis=-1)[..., 0]
+        s1 = numpy.take_along_axis(source, k + 1, axis=-1)[..., 0]
+
+        with numpy.errstate(invalid="ignore", divide="ignore"):
+            w = (t - s0) / (s1 - s0)
+
+        index[..., j] = k[..., 0]
+        weight[..., j] = numpy.where((w >= 0) & (w <= 1), w, numpy.nan)
+
+    return index, weight
+
+
+def _gather(data, index, weight):
+    """
+    Interpolate over the last axis of 'data' with bracketing levels and
+    weights from :func:`_bracket`
+
+    'index' and 'weight' may have fewer leading dimensions than 'data' (e.g.
+    a plan without ensemble or time), they are broadcast to match
+    """
+    shape = data.shape[:-1] + index.shape[-1:]
+    index = numpy.broadcast_to(index, shape)
+    weight = numpy.broadcast_to(weight, shape)
+
+    d0 = numpy.take_along_axis(data, index, axis=-1)
+    d1 = numpy.take_along_axis(data, index + 1, axis=-1)
+    return d0 + weight * (d1 - d0)
+
+
+def _numpy_kernel(data, source, target):
+    """
+    Column interpolation with numpy, over the last axis of 'data' and
+    'source'
+    """
+    dtype = numpy.result_type(data.dtype, numpy.float32)
+    index, weight = _bracket(source, target)
+    return _gather(data, index, weight).astype(dtype, copy=False)
+
+
+def interp_columns(data, source, target, log: bool = False):
+    """
+    Linearly interpolate columns of 'data' to where 'source' equals 'target'
+
+    Each column of 'source' must be monotonic (increasing or decreasing).
+    Targets outside of a column's range are NaN.
+
+    Args:
+        data: :obj:`numpy.ndarray` with levels as the last axis
+        source: :obj:`numpy.ndarray` of the same shape as 'data'
+        target: 1d array of target values
+        log: Interpolate in log(source), e.g. for pressure
+
+    Returns:
+        :obj:`numpy.ndarray` with the last axis replaced by the targets
+    """
+    target = numpy.asarray(target, dtype="float64")
+    dtype = numpy.result_type(data.dtype, numpy.float32)
+
+    if log:
+        source = numpy.log(source)
+        target = numpy.log(target)
+
+    kernel = _numba_kernel()
+    if kernel is not None:
+        if data.dtype != numpy.float32 or source.dtype != numpy.float32:
+            data = data.astype("float64")
+            source = source.astype("float64")
+        return kernel(data, source, target).astype(dtype, copy=False)
+
+    return _numpy_kernel(data, source, target)
+
+
+def _whole_columns(da, dim: str = "model_level_number"):
+    """
+    Rechunk Dask data so that each chunk holds whole columns along 'dim'
+
+    If that would make chunks larger than Dask's 'array.chunk-size' the
+    horizontal chunks are shrunk to fit
+    """
+    if da.chunks is None:
+        return da
+
+    chunks = {dim: -1}
+
+    size = da.dtype.itemsize * da.sizes[dim]
+    for d, c in zip(da.dims, da.chunks):
+        if d != dim:
+            size *= max(c)
+
+    if size > parse_bytes(dask.config.get("array.chunk-size")):
+        horizontal = [*horizontal_dims, "distance"]
+        chunks.update({d: "auto" for d in horizontal if d in da.dims})
+
+    return da.chunk(chunks)
 
 
 def vertical_interp(
-    ds: xarray.DataArray, source: xarray.DataArray, target
+    ds: xarray.DataArray, source: xarray.DataArray, target, log: bool = False
 ) -> xarray.DataArray:
     """
     Vertically interpolate the data in ds to the levels of 'target'
 
+    Dask data is interpolated chunk by chunk, with each chunk holding whole
+    columns. The model level dimension is rechunked, and the horizontal
+    dimensions too if needed to keep chunks within Dask's 'array.chunk-size'.
+    Load data with ``access="column"`` (see :func:`aus400.chunks.plan_chunks`)
+    to avoid rechunking.
+
     See also: :func:`to_plev`, :func:`to_height`
 
     Args:
@@ -35,38 +234,372 @@ def vertical_interp(
         source: Aus400 variable with the source level values (e.g.
             pressure, height)
         target: Target levels to regrid to
+        log: Interpolate linearly in log(source) rather than source
 
     Returns:
         :obj:`xarray.DataArray` on the target levels
     """
+    dim = "model_level_number"
+    new_dim = source.name if source.name is not None else "level"
+    target = numpy.atleast_1d(numpy.asarray(target, dtype="float64"))
 
-    grid = xgcm.grid(ds)
     source = match_slice(source, ds)
 
-    ds = ds.chunk({"model_level_number": None})
-    source = source.chunk({"model_level_number": None})
+    ds = _whole_columns(ds, dim)
+    source = _whole_columns(source, dim)
+
+    source = source.drop_vars(
+        [c for c in source.coords if c in ds.coords and c not in source.dims]
+    )
+
+    dtype = numpy.result_type(ds.dtype, numpy.float32)
+
+    result = xarray.apply_ufunc(
+        interp_columns,
+        ds,
+        source,
+        kwargs={"target": target, "log": log},
+        input_core_dims=[[dim], [dim]],
+        output_core_dims=[[new_dim]],
+        dask="parallelized",
+        output_dtypes=[dtype],
+        dask_gufunc_kwargs={"output_sizes": {new_dim: target.size}},
+        keep_attrs=True,
+    )
+
+    result.coords[new_dim] = target
+
+    # Put the new levels where the model levels were
+    dims = [new_dim if d == dim else d for d in ds.dims]
+    return result.transpose(*dims)
+
+
+class VerticalPlan:
+    """
+    Interpolation to fixed target values of a time-invariant level variable,
+    like 'height_rho'
+
+    The levels either side of each target and the interpolation weights are
+    found once for every column when the plan is made. Applying the plan to
+    data is then a gather of two levels and a multiply-add, for any variable
+    and time step on the same columns.
+
+    Plans may be saved with :meth:`save` and read back with :meth:`open`.
+
+    Args:
+        source: Level values, with dimension 'model_level_number' and no
+            time dimension (e.g. 'height_rho')
+        target: Target levels
+        log: Interpolate linearly in log(source) rather than source
+
+    Attributes:
+        data: :obj:`xarray.Dataset` with the lower bracketing level 'index'
+            and interpolation 'weight' of each column and target. Weights are
+            NaN where the target is outside of the column.
+        dim: Name of the target level dimension
+    """
+
+    def __init__(self, source: xarray.DataArray, target, log: bool = False):
+        level = "model_level_number"
+        self.dim = source.name if source.name is not None else "level"
+        target = numpy.atleast_1d(numpy.asarray(target, dtype="float64"))
+
+        source = _whole_columns(source, level).reset_coords(drop=True)
+
+        if log:
+            source = numpy.log(source)
+            bracket_target = numpy.log(target)
+        else:
+            bracket_target = target
+
+        index, weight = xarray.apply_ufunc(
+            _bracket,
+            source,
+            kwargs={"target": bracket_target},
+            input_core_dims=[[level]],
+            output_core_dims=[[self.dim], [self.dim]],
+            dask="parallelized",
+            output_dtypes=["int16", numpy.result_type(source.dtype, numpy.float32)],
+            dask_gufunc_kwargs={"output_sizes": {self.dim: target.size}},
+        )
+
+        self.data = xarray.Dataset({"index": index, "weight": weight})
+        self.data.coords[self.dim] = target
+        self.data.attrs["log"] = int(log)
+
+    @classmethod
+    def from_dataset(cls, data: xarray.Dataset, dim: str):
+        """
+        Plan from its :attr:`data`
+        """
+        plan = cls.__new__(cls)
+        plan.data = data
+        plan.dim = dim
+        return plan
+
+    @classmethod
+    def open(cls, path: Path, chunks=None):
+        """
+        Read a plan written by :meth:`save`
+
+        Args:
+            path: File to read
+            chunks: Dask chunks to open with (default read into memory)
+
+        Returns:
+            :class:`VerticalPlan`
+        """
+        if chunks is None:
+            with xarray.open_dataset(path) as ds:
+                data = ds.load()
+        else:
+            data = xarray.open_dataset(path, chunks=chunks)
+
+        return cls.from_dataset(data, data.attrs["dim"])
+
+    def save(self, path: Path):
+        """
+        Write the plan to a netCDF file
+
+        Args:
+            path: File to write
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        data = self.data.copy()
+        data.attrs["dim"] = self.dim
+        data.to_netcdf(path)
+
+    def persist(self):
+        """
+        Plan with its arrays computed, see :meth:`xarray.Dataset.persist`
+        """
+        return self.from_dataset(self.data.persist(), self.dim)
+
+    @property
+    def target(self) -> numpy.ndarray:
+        """
+        Target levels
+        """
+        return self.data[self.dim].values
+
+    def apply(self, ds: xarray.DataArray) -> xarray.DataArray:
+        """
+        Interpolate data to the plan's target levels
+
+        Args:
+            ds: Model level variable on the plan's columns (or a subset of
+                them), with any other dimensions
+
+        Returns:
+            :obj:`xarray.DataArray` on the target levels
+        """
+        level = "model_level_number"
+        plan = self.data.reset_coords(drop=True)
+
+        # Match the plan to the columns of 'ds'
+        columns = [d for d in plan["index"].dims if d != self.dim]
+        if not all(plan[d].equals(ds[d]) for d in columns):
+            plan = plan.sel({d: ds[d].values for d in columns}, method="nearest")
+            plan = plan.assign_coords({d: ds[d].values for d in columns})
+
+        if plan.chunks:
+            plan = plan.chunk({self.dim: -1})
+        ds = _whole_columns(ds, level)
+
+        coords = [c for c in ds.coords if c not in ds.dims and level in ds[c].dims]
+
+        result = xarray.apply_ufunc(
+            _gather,
+            ds.drop_vars(coords),
+            plan["index"],
+            plan["weight"],
+            input_core_dims=[[level], [self.dim], [self.dim]],
+            output_core_dims=[[self.dim]],
+            dask="parallelized",
+            output_dtypes=[numpy.result_type(ds.dtype, plan["weight"].dtype)],
+            keep_attrs=True,
+        )
+
+        result.coords[self.dim] = plan[self.dim]
+        result.name = ds.name
+
+        # Put the new levels where the model levels were
+        dims = [self.dim if d == level else d for d in ds.dims]
+        return result.transpose(*dims)
+
+
+# Plans made by height_plan(), least recently used first
+_plan_cache = collections.OrderedDict()
+_plan_lock = threading.Lock()
+_plan_cache_size = 8
+
+
+def _plan_key(ds, grid, variable, target, log) -> str:
+    """
+    Key of the plan interpolating the columns of 'ds' to 'target'
+    """
+    h = hashlib.sha1()
+    h.update(f"{grid.name} {variable} {int(log)}".encode())
+    h.update(numpy.asarray(target, dtype="float64").tobytes())
+
+    for c in ["latitude", "longitude"]:
+        h.update(numpy.asarray(ds[c].values, dtype="float64").tobytes())
+
+    return h.hexdigest()
+
 
-    return grid.transform(ds, "Z", target, target_data=source)
+def _section_like(source, ds):
+    """
+    Select the columns of 'source' matching the (possibly cross-section)
+    variable 'ds'
+    """
+    if "section" in ds.attrs:
+        source = section_like(source, ds)
+    elif "distance" in ds.dims:
+        if ds["longitude"].size > 1:
+            x0, x1 = ds["longitude"].values[0], ds["longitude"].values[-1]
+        else:
+            # meridional slice, x0 = x1
+            x0, x1 = ds["longitude"].values, ds["longitude"].values
+        if ds["latitude"].size > 1:
+            y0, y1 = ds["latitude"].values[0], ds["latitude"].values[-1]
+        else:
+            # zonal slice, y0 = y1
+            y0, y1 = ds["latitude"].values, ds["latitude"].values
+        source = cross_sec(source, x0, y0, x1, y1)
+
+    # Reindex to the input dataset
+    # This removes any problems which occur due to mismatched grids (sometimes
+    # latitude/longitude differs by very small numerical values between
+    # datasets)
+    return source.reindex_like(ds, method="nearest")
+
+
+def _columns_region(ds, grid):
+    """
+    :func:`aus400.cat.load_all` arguments to load only the columns of 'ds'
+    from a level variable
+
+    This is the bounding box of the columns, padded by a grid point, with
+    the variable chunked for 'column' access. For cross-sections it is the
+    box around the section, so only the section's rows or columns are read
+    for zonal and meridional sections, and the variable is chunked for
+    'section' access so diagonal sections read only the chunks along their
+    path.
+    """
+    if "section" in ds.attrs:
+        west, south, east, north = section_bbox(ds)
+        access = "section"
+    else:
+        west, east = numpy.min(ds["longitude"].values), numpy.max(ds["longitude"].values)
+        south, north = numpy.min(ds["latitude"].values), numpy.max(ds["latitude"].values)
+        access = "column"
+
+    pad = grid.spacing
+    return {
+        "bbox": (west - pad, south - pad, east + pad, north + pad),
+        "access": access,
+    }
+
+
+def height_plan(ds, levels, cache: bool = False) -> VerticalPlan:
+    """
+    :class:`VerticalPlan` interpolating the columns of 'ds' to height levels
+
+    Plans are kept, so repeated calls for the same columns and levels are
+    cheap. Plans no larger than Dask's 'array.chunk-size' are computed and
+    held in memory, larger plans (e.g. for the full domain) stay lazy. With
+    'cache', plans are instead saved under 'vertical/' in
+    :func:`aus400.cat.cache_dir`, read from there, and reused by later
+    sessions.
+
+    Args:
+        ds: Aus400 variable on the 't' grid, may be a region or cross-section
+        levels: Target height levels
+        cache: Keep the plan on disk
+
+    Returns:
+        :class:`VerticalPlan` for the columns of 'ds'
+    """
+    grid = grids.identify(ds)
+
+    if grid.stagger != "t":
+        raise Exception(
+            f"Can't vertically regrid data on '{grid.stagger}' grid, regrid to 't' first"
+        )
+
+    key = _plan_key(ds, grid, "height_rho", levels, False)
+
+    with _plan_lock:
+        plan = _plan_cache.get(key)
+        if plan is not None:
+            _plan_cache.move_to_end(key)
+            return plan
+
+    path = cache_dir() / "vertical" / f"height_rho_{key}.nc"
+
+    if cache and path.exists():
+        plan = VerticalPlan.open(path)
+    else:
+        height = load_var(
+            resolution=grid.resolution,
+            stream="fx",
+            variable="height_rho",
+            **_columns_region(ds, grid),
+        )
+        plan = VerticalPlan(_section_like(height, ds), levels)
+
+        if cache:
+            plan.save(path)
+            plan = VerticalPlan.open(path)
+        elif plan.data.nbytes <= parse_bytes(dask.config.get("array.chunk-size")):
+            # Only hold the plan in memory for regions and sections, a plan
+            # for the full domain is as large as the height field
+            plan = plan.persist()
 
+    with _plan_lock:
+        _plan_cache[key] = plan
+        while len(_plan_cache) > _plan_cache_size:
+            _plan_cache.popitem(last=False)
 
-def to_plev(ds, levels):
+    return plan
+
+
+def clear_plan_cache():
+    """
+    Empty the in-memory cache of :func:`height_plan`
+
+    Plans saved on disk are kept
+    """
+    with _plan_lock:
+        _plan_cache.clear()
+
+
+def to_plev(ds, levels, log: bool = False):
     """
     Interpolate the data in ds to the supplied pressure levels
 
+    Only the region of the pressure field covering 'ds' is read. Cross-sections
+    made by :func:`aus400.cross_sec.cross_sec` carry their geometry, which is
+    used to section the pressure along the same line.
+
     Args:
         da: Aus400 variable to regrid
         target: Target levels to regrid to
+        log: Interpolate linearly in log(pressure) rather than pressure
 
     Returns:
         :obj:`xarray.DataArray` on the target levels
     """
 
-    res = identify_resolution(ds)
-    sub = identify_subgrid(ds)
+    grid = grids.identify(ds)
+    res = grid.resolution
 
-    if sub != "t":
+    if grid.stagger != "t":
         raise Exception(
-            f"Can't vertically regrid data on '{sub}' grid, regrid to 't' first"
+            f"Can't vertically regrid data on '{grid.stagger}' grid, regrid to 't' first"
         )
 
     pressure = load_var(
@@ -80,72 +613,173 @@ def to_plev(ds, levels):
             + pandas.offsets.Hour(),
         ),
         ensemble=slice(ds["ensemble"].values[0], ds["ensemble"].values[-1]),
+        **_columns_region(ds, grid),
     )
 
     # may need to c.s. data if the input is also c.s.
-    if "distance" in ds.dims:
-        if ds["longitude"].size > 1:
-            x0, x1 = ds["longitude"].values[0], ds["longitude"].values[-1]
-        else:
-            # meridional slice, x0 = x1
-            x0, x1 = ds["longitude"].values, ds["longitude"].values
-        if ds["latitude"].size > 1:
-            y0, y1 = ds["latitude"].values[0], ds["latitude"].values[-1]
-        else:
-            # zonal slice, y0 = y1
-            y0, y1 = ds["latitude"].values, ds["latitude"].values
-        pressure = cross_sec(pressure, x0, y0, x1, y1)
-
-    # Reindex pressure to input dataset
-    # This removes any problems which occur due to mismatched grids (sometimes latitude/longitude
-    # differs by very small numerical values between datasets)
-    pressure = pressure.reindex_like(ds, method='nearest')
+    pressure = _section_like(pressure, ds)
 
-    return vertical_interp(ds, pressure, levels)
+    return vertical_interp(ds, pressure, levels, log=log)
 
 
-def to_height(ds, levels):
+def to_height(ds, levels, cache: bool = False):
     """
     Interpolate the data in ds to the supplied height levels
 
+    Height levels don't change with time, so the interpolation is planned
+    once for the columns of 'ds' with :func:`height_plan` and reused for
+    every time step, and for other variables on the same columns.
+
     Args:
         da: Aus400 variable to regrid
         target: Target levels to regrid to
+        cache: Keep the interpolation plan on disk, see :func:`height_plan`
 
     Returns:
         :obj:`xarray.DataArray` on the target levels
     """
 
-    res = identify_resolution(ds)
-    sub = identify_subgrid(ds)
+    return height_plan(ds, levels, cache=cache).apply(ds)
 
-    if sub != "t":
-        raise Exception(
-            f"Can't vertically regrid data on '{sub}' grid, regrid to 't' first"
+
+def _window_path(path: Path, start) -> Path:
+    """
+    netCDF file for the window starting at 'start' in output directory 'path'
+    """
+    return path / f"{path.name}_{pandas.Timestamp(start):%Y%m%dT%H%M}.nc"
+
+
+def _zarr_times(path: Path):
+    """
+    Times already written to the Zarr store 'path'
+    """
+    if not path.exists():
+        return numpy.array([], dtype="datetime64[ns]")
+
+    with xarray.open_zarr(path) as ds:
+        return ds["time"].values
+
+
+_zarr_time_encoding = {"time": {"units": "minutes since 1970-01-01", "dtype": "int64"}}
+
+
+def write_levels(
+    path,
+    variables,
+    levels,
+    coordinate: str = "pressure",
+    log: bool = False,
+    window: int = 1,
+    cat=None,
+    **kwargs,
+) -> Path:
+    """
+    Write model level variables interpolated to pressure or height levels
+
+    The catalogue is worked through 'window' files at a time. Each window
+    is loaded, interpolated as by :func:`to_plev` or :func:`to_height`,
+    computed and written out before the next is started, so the memory used
+    depends on the window size rather than the length of the run.
+
+    If 'path' ends with '.zarr' the windows are appended along 'time' to a
+    single Zarr store, otherwise 'path' is a directory with one netCDF file
+    per window. Either way the output can be opened as one dataset, with
+    :func:`xarray.open_zarr` or :func:`xarray.open_mfdataset`.
+
+    Writing can be resumed: windows already present in the output are
+    skipped, so an interrupted run can be restarted with the same arguments.
+    netCDF files are moved into place once complete, a Zarr window is only
+    counted as written once its times are in the store.
+
+    Args:
+        path: Output Zarr store or netCDF directory
+        variables: Names of the 'mdl' variables to write
+        levels: Target levels
+        coordinate: 'pressure' or 'height'
+        log: Interpolate linearly in log(pressure), see :func:`to_plev`
+        window: Number of files to process at once
+        cat: Source catalogue (default :data:`aus400.cat.catalogue`)
+        **kwargs: Selection, see :func:`aus400.cat.load_all`. Must select a
+            single resolution.
+
+    Returns:
+        :obj:`pathlib.Path` of the output
+    """
+    if isinstance(variables, str):
+        variables = [variables]
+
+    if coordinate == "pressure":
+        interp = functools.partial(to_plev, levels=levels, log=log)
+    elif coordinate == "height":
+        interp = functools.partial(to_height, levels=levels)
+    else:
+        raise ValueError(f"Unknown coordinate '{coordinate}', use 'pressure' or 'height'")
+
+    region = {k: kwargs.pop(k) for k in ["latitude", "longitude", "bbox"] if k in kwargs}
+
+    c = filter_catalogue(cat, stream="mdl", variable=variables[0], **kwargs)
+    if len(c) == 0:
+        raise ValueError("Selection is empty")
+    if c["resolution"].nunique() > 1:
+        raise ValueError("Selection contains multiple resolutions, refine the filter")
+
+    times = numpy.sort(pandas.DatetimeIndex(c["time"].unique()).to_numpy())
+    windows = [times[i:i + window] for i in range(0, len(times), window)]
+    ends = [w[0] for w in windows[1:]] + [None]
+
+    path = Path(path)
+    use_zarr = path.suffix == ".zarr"
+    if use_zarr:
+        written = _zarr_times(path)
+    else:
+        path.mkdir(parents=True, exist_ok=True)
+
+    for files, end in zip(windows, ends):
+        if use_zarr:
+            # Windows are appended whole, so any time in the window's range
+            # means it was written
+            inside = written >= files[0]
+            if end is not None:
+                inside &= written < end
+            if inside.any():
+                continue
+        elif _window_path(path, files[0]).exists():
+            continue
+
+        select = {
+            "access": "column",
+            **kwargs,
+            **region,
+            "time": slice(files[0], files[-1]),
+        }
+
+        ds = xarray.Dataset(
+            {
+                v: interp(load_var(v, cat, stream="mdl", cache=False, **select))
+                for v in variables
+            }
         )
 
-    height = load_var(resolution=res, stream="fx", variable="height_rho")
+        # Compute the window before writing, so only one window is held in
+        # memory at a time
+        ds = ds.compute()
 
-    # may need to c.s. data if the input is also c.s.
-    if "distance" in ds.dims:
-        if ds["longitude"].size > 1:
-            x0, x1 = ds["longitude"].values[0], ds["longitude"].values[-1]
-        else:
-            # meridional slice, x0 = x1
-            x0, x1 = ds["longitude"].values, ds["longitude"].values
-        if ds["latitude"].size > 1:
-            y0, y1 = ds["latitude"].values[0], ds["latitude"].values[-1]
-        else:
-            # zonal slice, y0 = y1
-            y0, y1 = ds["latitude"].values, ds["latitude"].values
-        height = cross_sec(height, x0, y0, x1, y1)
+        if use_zarr:
+            if written.size == 0:
+                # Appended windows take the time encoding of the first, which
+                # xarray would otherwise pick to suit only its own times
+                ds.to_zarr(path, mode="w", encoding=_zarr_time_encoding)
+            else:
+                ds.to_zarr(path, append_dim="time")
+            written = numpy.concatenate([written, ds["time"].values])
 
-    # Reindex height to input dataset
-    # This removes any problems which occur due to mismatched grids (sometimes latitude/longitude
-    # differs by very small numerical values between datasets)
-    height = height.reindex_like(ds, method='nearest')
+        else:
+            out = _window_path(path, files[0])
+            tmp = out.with_name(f".{out.name}.{os.getpid()}")
+            ds.to_netcdf(tmp)
+            os.replace(tmp, out)
 
-    return vertical_interp(ds, height, levels)
+    return path
 
 
 def match_slice(da, target):
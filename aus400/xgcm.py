@@ -52,7 +52,7 @@ def grid(ds):
     """
 
     coords = {
-        "X": {"center": "latitude"},
+        "X": {"center": "longitude"},
         "Y": {"center": "latitude"},
     }
 
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# Copyright 2020 Scott Wales
+# author: Scott Wales <scott.wales@unimelb.edu.au>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Per-query latency of :func:`aus400.cat.filter_catalogue`
+
+Compares an unindexed catalogue (one boolean mask per keyword) against the
+sorted MultiIndex from :func:`aus400.cat.index_catalogue`, using a synthetic
+catalogue of about a million rows. Also reports the memory used by the
+catalogue with and without categorical columns. Run from the repository root
+with::
+
+    python benchmarks/bench_catalogue.py
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+import numpy
+import pandas
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from aus400.cat import filter_catalogue, index_catalogue, index_columns  # noqa: E402
+
+
+def synthetic_catalogue(nrows=1_000_000):
+    """
+    Build a catalogue shaped like Aus400's with about 'nrows' rows
+    """
+    resolutions = ["d0036", "d0198"]
+    streams = ["cldrad", "mdl", "slv", "spec"]
+    variables = [f"var{i:02d}" for i in range(25)]
+    ensembles = [0, 1, 2, 3]
+    ntime = nrows // (len(resolutions) * len(streams) * len(variables) * len(ensembles))
+    times = pandas.date_range("20170327T0000", periods=ntime, freq="10min")
+
+    index = pandas.MultiIndex.from_product(
+        [resolutions, streams, variables, ensembles, times], names=index_columns
+    )
+    cat = index.to_frame(index=False)
+    cat["runid"] = "u-bq574"
+    cat["path"] = [f"file{i}.nc" for i in range(len(cat))]
+
+    # Shuffle, so the unindexed catalogue doesn't benefit from file order
+    return cat.sample(frac=1, random_state=0).reset_index(drop=True)
+
+
+def memory_mb(cat):
+    return (cat.memory_usage(deep=True).sum() + cat.index.memory_usage(deep=True)) / 1e6
+
+
+def main():
+    plain = synthetic_catalogue()
+    t0 = timeit.default_timer()
+    indexed = index_catalogue(plain)
+    build = timeit.default_timer() - t0
+
+    times = plain["time"].sort_values().unique()
+    rng = numpy.random.default_rng(0)
+
+    queries = {
+        "single file": lambda: {
+            "resolution": "d0036",
+            "stream": "spec",
+            "variable": "var07",
+            "ensemble": 0,
+            "time": times[rng.integers(len(times))],
+        },
+        "time slice": lambda: {
+            "resolution": "d0198",
+            "stream": "mdl",
+            "variable": "var03",
+            "ensemble": slice(0, 3),
+            "time": slice(times[100], times[136]),
+        },
+        "variable": lambda: {"stream": "slv", "variable": "var11"},
+    }
+
+    categorical = indexed.copy()
+    for k in ["runid", "resolution", "stream", "variable"]:
+        categorical[k] = categorical[k].astype("category")
+
+    print(f"Catalogue rows: {len(plain)}")
+    print(f"Index build time: {build * 1e3:.1f} ms")
+    print(f"Memory (object columns): {memory_mb(indexed):.0f} MB")
+    print(f"Memory (categorical columns): {memory_mb(categorical):.0f} MB")
+    print(f"{'query':>12} {'unindexed':>12} {'indexed':>12} {'speedup':>8}")
+
+    for name, query in queries.items():
+        n = 20
+        t_plain = timeit.timeit(lambda: filter_catalogue(plain, **query()), number=n)
+        t_index = timeit.timeit(lambda: filter_catalogue(indexed, **query()), number=n)
+
+        assert len(filter_catalogue(plain, **query())) == len(
+            filter_catalogue(indexed, **query())
+        )
+
+        print(
+            f"{name:>12} {t_plain / n * 1e3:>9.2f} ms {t_index / n * 1e3:>9.2f} ms"
+            f" {t_plain / t_index:>7.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# Copyright 2020 Scott Wales
+# author: Scott Wales <scott.wales@unimelb.edu.au>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Dask task counts and wall times of :func:`aus400.cat.load_all` chunking
+
+Compares the old fixed policy (500x500 horizontal chunks, one step along every
+other dimension) against :func:`aus400.chunks.plan_chunks` for each access
+pattern, using synthetic 'mdl' and 'spec' files written to a temporary
+directory. Run from the repository root with::
+
+    python benchmarks/bench_chunks.py
+"""
+
+import sys
+import tempfile
+import timeit
+import warnings
+from pathlib import Path
+
+import numpy
+import pandas
+import xarray
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import aus400.cat  # noqa: E402
+
+nlat, nlon = 1200, 1600
+disk_chunks = {"latitude": 200, "longitude": 200}
+
+
+def write_files(root: Path):
+    """
+    Write synthetic files, returning their catalogue
+    """
+    rows = []
+    start = pandas.Timestamp("20170327T0000")
+    lat = numpy.linspace(-30, -20, nlat)
+    lon = numpy.linspace(130, 140, nlon)
+    rng = numpy.random.default_rng(0)
+
+    for stream, var, levels, steps, nfiles in [
+        ("mdl", "air_temp", 30, 1, 4),
+        ("spec", "sfc_temp", None, 6, 8),
+    ]:
+        for f in range(nfiles):
+            t0 = start + pandas.Timedelta(hours=f)
+            times = t0 + pandas.Timedelta(minutes=10) * numpy.arange(steps)
+
+            dims = ["time", "latitude", "longitude"]
+            shape = [steps, nlat, nlon]
+            coords = {"time": times, "latitude": lat, "longitude": lon}
+            if levels is not None:
+                dims.insert(1, "model_level_number")
+                shape.insert(1, levels)
+                coords["model_level_number"] = numpy.arange(1, levels + 1)
+
+            da = xarray.DataArray(
+                rng.random(shape, dtype="float32"), dims=dims, coords=coords, name=var
+            )
+            chunksizes = [disk_chunks.get(d, 1) for d in dims]
+
+            path = f"{stream}/{var}_{t0:%Y%m%dT%H%M}.nc"
+            (root / path).parent.mkdir(parents=True, exist_ok=True)
+            da.to_dataset().to_netcdf(
+                root / path, encoding={var: {"chunksizes": chunksizes}}
+            )
+
+            rows.append(
+                {
+                    "resolution": "d0198",
+                    "stream": stream,
+                    "variable": var,
+                    "ensemble": 0,
+                    "time": t0,
+                    "path": path,
+                }
+            )
+
+    return aus400.cat.index_catalogue(pandas.DataFrame(rows))
+
+
+def fixed_chunks(cat, var):
+    path = aus400.cat.filter_catalogue(cat, variable=var)["path"].iloc[0]
+    dims = aus400.cat._file_metadata(aus400.cat.root / path, var)["dims"]
+    chunks = {"latitude": 500, "longitude": 500}
+    chunks.update({d: 1 for d in dims if d not in chunks})
+    return chunks
+
+
+workloads = {
+    "map": ("air_temp", lambda da: da.isel(model_level_number=0).mean()),
+    "column": ("air_temp", lambda da: da.mean("model_level_number")),
+    "timeseries": (
+        "sfc_temp",
+        lambda da: da.isel(latitude=slice(0, 50), longitude=slice(0, 50)).mean(
+            ["latitude", "longitude"]
+        ),
+    ),
+}
+
+
+def main():
+    # The fixed policy splits disk chunks, which xarray warns about
+    warnings.simplefilter("ignore", UserWarning)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        aus400.cat.root = Path(tmp)
+        cat = write_files(Path(tmp))
+
+        print(f"{'access':>10} {'policy':>8} {'chunk':>28} {'tasks':>7} {'time':>9}")
+
+        for access, (var, work) in workloads.items():
+            for policy in ["fixed", "planned"]:
+                if policy == "fixed":
+                    kwargs = {"chunks": fixed_chunks(cat, var)}
+                else:
+                    kwargs = {"access": access}
+
+                da = aus400.cat.load_var(var, cat=cat, **kwargs)
+                result = work(da)
+
+                tasks = len(result.data.__dask_graph__())
+                wall = timeit.timeit(result.compute, number=3) / 3
+                chunk = "x".join(str(c[0]) for c in da.chunks)
+
+                print(
+                    f"{access:>10} {policy:>8} {chunk:>28} {tasks:>7}"
+                    f" {wall * 1e3:>6.0f} ms"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# Copyright 2020 Scott Wales
+# author: Scott Wales <scott.wales@unimelb.edu.au>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Throughput of :func:`aus400.regrid.apply_weights` against climtas
+
+Regrids a synthetic multi-level 'mdl' field on part of the d0036t grid to the
+matching part of the d0198t grid with both :func:`climtas.regrid.regrid` and
+:func:`aus400.regrid.apply_weights`, using bilinear weights written in ESMF
+format. Both paths get the same Dask input, chunked one level and time step
+at a time as :func:`aus400.cat.load_all` does, and the results are checked to
+agree. Run from the repository root with::
+
+    python benchmarks/bench_regrid.py
+"""
+
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+import numpy
+import scipy.sparse
+import xarray
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from aus400.regrid import RegridWeights, apply_weights  # noqa: E402
+
+nlat, nlon = 1100, 1320
+steps, levels = 4, 30
+
+
+def linear_weights(source, target):
+    """
+    1d linear interpolation matrix from 'source' to 'target' points
+    """
+    upper = numpy.clip(numpy.searchsorted(source, target), 1, source.size - 1)
+    lower = upper - 1
+    frac = (target - source[lower]) / (source[upper] - source[lower])
+
+    rows = numpy.arange(target.size)
+    return scipy.sparse.csr_matrix(
+        (
+            numpy.concatenate([1 - frac, frac]),
+            (numpy.concatenate([rows, rows]), numpy.concatenate([lower, upper])),
+        ),
+        shape=(target.size, source.size),
+    )
+
+
+def write_weights(path: Path, lat_a, lon_a, lat_b, lon_b):
+    """
+    Write bilinear weights in ESMF format
+    """
+    matrix = scipy.sparse.kron(
+        linear_weights(lat_a, lat_b), linear_weights(lon_a, lon_b)
+    ).tocoo()
+    xc_b, yc_b = numpy.meshgrid(lon_b, lat_b)
+
+    xarray.Dataset(
+        {
+            "S": ("n_s", matrix.data),
+            "row": ("n_s", matrix.row + 1),
+            "col": ("n_s", matrix.col + 1),
+            "src_grid_dims": ("src_grid_rank", [lon_a.size, lat_a.size]),
+            "dst_grid_dims": ("dst_grid_rank", [lon_b.size, lat_b.size]),
+            "xc_a": ("n_a", numpy.repeat(lon_a[None, :], lat_a.size, 0).ravel()),
+            "yc_a": ("n_a", numpy.repeat(lat_a[:, None], lon_a.size, 1).ravel()),
+            "xc_b": ("n_b", xc_b.ravel()),
+            "yc_b": ("n_b", yc_b.ravel()),
+        }
+    ).to_netcdf(path)
+
+
+def main():
+    import climtas.regrid
+
+    lat_a = -27.8 + 0.0036 * numpy.arange(nlat)
+    lon_a = 133.26 + 0.0036 * numpy.arange(nlon)
+    lat_b = -27.8 + 0.0198 * numpy.arange(int((lat_a[-1] - lat_a[0]) / 0.0198) + 1)
+    lon_b = 133.26 + 0.0198 * numpy.arange(int((lon_a[-1] - lon_a[0]) / 0.0198) + 1)
+
+    rng = numpy.random.default_rng(0)
+    da = xarray.DataArray(
+        rng.random((steps, levels, nlat, nlon), dtype="float32"),
+        dims=["time", "model_level_number", "latitude", "longitude"],
+        coords={
+            "model_level_number": numpy.arange(1, levels + 1),
+            "latitude": lat_a,
+            "longitude": lon_a,
+        },
+        name="air_temp",
+    ).chunk({"time": 1, "model_level_number": 1})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "weights_d0036t_to_d0198t.nc"
+        write_weights(path, lat_a, lon_a, lat_b, lon_b)
+
+        with xarray.open_dataset(path) as ds:
+            ds = ds.load()
+
+        def run_climtas():
+            return climtas.regrid.regrid(da, weights=ds).compute()
+
+        def run_sparse():
+            # Includes building the operator, as the first to_d0198() call does
+            return apply_weights(da, RegridWeights.from_esmf(ds)).compute()
+
+        a = numpy.asarray(run_climtas())
+        b = numpy.asarray(run_sparse())
+        numpy.testing.assert_allclose(a, b, rtol=1e-5)
+
+        print(f"{steps} steps x {levels} levels, {nlat}x{nlon} to ", end="")
+        print(f"{lat_b.size}x{lon_b.size}")
+        for name, run in [("climtas", run_climtas), ("sparse", run_sparse)]:
+            wall = timeit.timeit(run, number=3) / 3
+            rate = steps * levels / wall
+            print(f"{name:>8} {wall * 1e3:>8.0f} ms {rate:>8.1f} slices/s")
+
+
+if __name__ == "__main__":
+    main()
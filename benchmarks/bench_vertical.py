@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# Copyright 2020 Scott Wales
+# author: Scott Wales <scott.wales@unimelb.edu.au>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Throughput and memory of :func:`aus400.vertical.vertical_interp` against xgcm
+
+Interpolates a synthetic 70 level 'mdl' field to pressure levels with both
+:meth:`xgcm.Grid.transform` (the previous implementation) and
+:func:`aus400.vertical.vertical_interp`, using the same Dask input chunked
+horizontally. The results are checked to agree, then the wall time and peak
+Python memory (from :mod:`tracemalloc`) of each are reported. Run from the
+repository root with::
+
+    python benchmarks/bench_vertical.py
+"""
+
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy
+import xarray
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from aus400.vertical import vertical_interp, _numba_kernel  # noqa: E402
+
+nlat, nlon = 400, 500
+steps, levels = 2, 70
+plevs = numpy.linspace(100000, 10000, 19)
+
+
+def sample():
+    """
+    Synthetic temperature and pressure on model levels
+    """
+    rng = numpy.random.default_rng(0)
+    shape = (steps, levels, nlat, nlon)
+    level = numpy.arange(1, levels + 1)[None, :, None, None]
+
+    pressure = 102000 * numpy.exp(-level / 15) + 500 * rng.random(shape)
+    temp = 300 - 0.8 * level + rng.random(shape)
+
+    coords = {
+        "model_level_number": numpy.arange(1, levels + 1),
+        "latitude": -27.8 + 0.0198 * numpy.arange(nlat),
+        "longitude": 133.26 + 0.0198 * numpy.arange(nlon),
+    }
+    dims = ["time", "model_level_number", "latitude", "longitude"]
+    chunks = {"time": 1, "latitude": 100, "longitude": 100}
+
+    temp = xarray.DataArray(
+        temp.astype("float32"), dims=dims, coords=coords, name="air_temp"
+    )
+    pressure = xarray.DataArray(
+        pressure.astype("float32"), dims=dims, coords=coords, name="pressure"
+    )
+
+    return temp.chunk(chunks), pressure.chunk(chunks)
+
+
+def measure(run):
+    """
+    Wall time and peak traced memory of run()
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = run()
+    wall = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, wall, peak
+
+
+def main():
+    import aus400.xgcm
+
+    temp, pressure = sample()
+    target = xarray.DataArray(plevs, dims=["pressure"], name="pressure")
+
+    def run_xgcm():
+        ds = xarray.Dataset({"air_temp": temp, "pressure": pressure})
+        grid = aus400.xgcm.grid(ds)
+        return grid.transform(
+            temp, "Z", target, target_data=pressure, method="linear"
+        ).compute()
+
+    def run_kernel():
+        return vertical_interp(temp, pressure, plevs).compute()
+
+    # Compile the numba kernel up front
+    if _numba_kernel() is not None:
+        vertical_interp(temp[:1, :, :10, :10], pressure[:1, :, :10, :10], plevs).compute()
+
+    a, _, _ = measure(run_xgcm)
+    b, _, _ = measure(run_kernel)
+    numpy.testing.assert_allclose(
+        a.transpose(*b.dims).values, b.values, rtol=1e-4, equal_nan=True
+    )
+
+    kernel = "numba" if _numba_kernel() is not None else "numpy"
+    print(f"{steps} steps x {levels} levels, {nlat}x{nlon} to {plevs.size} levels")
+    for name, run in [("xgcm", run_xgcm), (kernel, run_kernel)]:
+        _, wall, peak = measure(run)
+        rate = steps * nlat * nlon / wall / 1e6
+        print(
+            f"{name:>8} {wall * 1e3:>8.0f} ms {rate:>8.2f} Mcolumns/s"
+            f" {peak / 2**20:>8.1f} MiB peak"
+        )
+
+
+if __name__ == "__main__":
+    main()